@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import tempfile
 import dj_database_url
 from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
@@ -59,12 +60,18 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para medir la petición completa (también los estáticos de WhiteNoise)
+    'webpage.registro.RegistroPeticionesMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Después de WhiteNoise (los estáticos no la necesitan) y antes de la vista, para los 103 Early Hints
+    'webpage.precarga.PrecargaMiddleware',
     'webpage.middleware.MediaFilesMiddleware',  # Agregar nuestro middleware
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
+    # Debajo de CSRF para detectar las páginas que llevan token (mitigación BREACH)
+    'webpage.middleware.CompresionDinamicaMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -72,13 +79,23 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'Vmmodulares.urls'
 
+# En producción las plantillas compiladas se guardan en memoria (cargador cacheado);
+# wsgi.py las precompila todas al arrancar cada worker.
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    TEMPLATE_LOADERS = [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates']
         ,
-        'APP_DIRS': True,
-        'OPTIONS': {            'context_processors': [
+        'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
+            'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
@@ -99,6 +116,19 @@ DATABASES = {
     'default': dj_database_url.config(default=os.getenv('DATABASE_URL'))
 }
 
+# Caché compartida por los workers de gunicorn del mismo host (SQLite en WAL, ver webpage.cache).
+# Debe estar en disco local del contenedor, no en el volumen de media.
+CACHES = {
+    'default': {
+        'BACKEND': 'webpage.cache.CacheSQLite',
+        'LOCATION': os.getenv('CACHE_PATH', os.path.join(tempfile.gettempdir(), 'vmmodulares_cache.sqlite3')),
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+            'MAX_BYTES': 64 * 1024 * 1024,
+        },
+    }
+}
+
 """
 DATABASES2 = {
     'default': {
@@ -149,27 +179,155 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 
 # WhiteNoise configuration
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# El storage de estáticos extiende CompressedManifestStaticFilesStorage: hash en el nombre,
+# compresión gzip/brotli, minificación de CSS/JS y generación del CSS crítico.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'webpage.storage.EstaticosOptimizadosStorage',
+    },
+    # Fotos del catálogo: cada imagen distinta se guarda una sola vez (nombre = hash del contenido)
+    'fotos': {
+        'BACKEND': 'webpage.storage.MediaDeduplicadaStorage',
+        'OPTIONS': {'prefijo': 'fotos'},
+    },
+}
 WHITENOISE_USE_FINDERS = True
 WHITENOISE_MANIFEST_STRICT = False
 WHITENOISE_ALLOW_ALL_ORIGINS = True
 
+# CSS crítico: reglas que se insertan en el <head> (contenido visible sin hacer scroll).
+# El resto de la hoja se carga de forma diferida con {% css_diferido %}.
+CSS_CRITICO_ACTIVO = os.getenv('CSS_CRITICO_ACTIVO', 'True').lower() == 'true'
+CSS_CRITICO = {
+    'css/home.css': [
+        ':root', 'html', 'body', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'small',
+        '.lead', '.display-3', '.text-primary', '.fixed-top', '.header',
+        '.navbar', '.navbar-brand', '.navbar-toggler', '.nav-link', '.dropdown-menu',
+        '.hero', '.hero-background', '.hero-overlay', '.btn-warning', '.btn-outline-light',
+        '.hero-imagen', '.scroll-indicator', '.animate-bounce',
+    ],
+}
+
+# Límites de las imágenes subidas (fotos de subcategorías). Las que los superan se rechazan
+# antes de decodificarlas para no agotar la memoria del worker.
+IMAGEN_MAX_MB = 30
+IMAGEN_MAX_MEGAPIXELES = 60  # Cubre fotos de 48 MP de teléfonos actuales
+
+# Variantes responsive de las imágenes estáticas generadas por collectstatic
+# (ver webpage.storage y el tag {% responsive_static %})
+IMAGENES_RESPONSIVE_ANCHOS = [480, 960, 1440, 1920]
+IMAGENES_RESPONSIVE_FORMATOS = ['avif', 'webp']  # Se omiten los que Pillow no soporte
+IMAGENES_RESPONSIVE_CALIDAD = {'avif': 50, 'webp': 75}  # Calidad visual similar en ambos formatos
+
+# Service worker (/sw.js, ver webpage/templates/sw.js): estáticos que se precargan en la primera
+# visita (collectstatic genera la lista con hash), fotos de /media/ que se guardan como mucho y
+# cada cuántos segundos se revalida en segundo plano una respuesta guardada de la API de fotos
+SERVICE_WORKER_PRECACHE = ['css/home.css', 'js/home.js', 'images/logo-vm-modulares.svg']
+SERVICE_WORKER_MEDIA_MAX = 300
+SERVICE_WORKER_API_REVALIDAR = 60 * 5
+
+# Precarga de los recursos críticos de la home (webpage.precarga): cabecera Link en la respuesta
+# y 103 Early Hints si el servidor WSGI los soporta. PRECARGA_CATEGORIAS: categorías cuya foto
+# destacada visible se precarga (con prioridad baja, están debajo del hero).
+PRECARGA_ACTIVA = os.getenv('PRECARGA_ACTIVA', 'True').lower() == 'true'
+PRECARGA_IMAGEN_LCP = 'images/hero-bg.jpg'
+PRECARGA_ESTATICOS = {'css/home.css': 'style', 'images/logo-vm-modulares.svg': 'image'}
+PRECARGA_CATEGORIAS = 1
+# Origen -> preconnect con crossorigin: solo si el recurso se pide en modo CORS (las fuentes
+# de gstatic); la hoja de googleapis se pide sin CORS y no reutilizaría esa conexión
+PRECARGA_ORIGENES = {'https://fonts.googleapis.com': False, 'https://fonts.gstatic.com': True}
+FUENTES_URL = (
+    'https://fonts.googleapis.com/css2?family=Montserrat:wght@300;400;500;600;700;800'
+    '&family=Open+Sans:wght@300;400;500;600;700&family=Playfair+Display:wght@400;500;600;700;800&display=swap'
+)
+
 # Media files configuration
 MEDIA_URL = '/media/'
 if DEBUG:
     # En desarrollo, usar directorio local
     MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-    print(f"DEBUG=True: MEDIA_ROOT = {MEDIA_ROOT}")
 else:
     # En producción (Railway), usar el volumen persistente
     MEDIA_ROOT = '/media'
-    print(f"DEBUG=False: MEDIA_ROOT = {MEDIA_ROOT}")
 
 # Configuración específica para Railway - eliminar configuración de WhiteNoise para media
 if not DEBUG:
     # Solo mantener WhiteNoise para archivos estáticos
     WHITENOISE_STATIC_PREFIX = '/static/'
 
+# Duración de los fragmentos de plantilla del catálogo. La clave incluye la versión de la
+# categoría, así que un cambio en el admin invalida el fragmento sin esperar a que expire.
+CATALOGO_CACHE_TIMEOUT = 60 * 60 * 24
+# Búsqueda del catálogo en memoria (webpage.catalogo_busqueda): los workers se enteran de los
+# cambios por el contador de versión de la caché compartida; además, cada tantos segundos comparan
+# la huella del catálogo en la base de datos por si la caché perdió el contador.
+CATALOGO_BUSQUEDA_REVALIDAR = 300
+
+# CDN delante de las páginas públicas (webpage.cdn): home, sitemap y las APIs del catálogo son
+# iguales para todos los visitantes anónimos. La CDN las guarda CDN_S_MAXAGE segundos y se purgan
+# por Surrogate-Key cuando cambia el catálogo; el navegador revalida en cada visita.
+CDN_MAX_AGE = 0
+CDN_S_MAXAGE = 60 * 60 * 24
+CDN_STALE_WHILE_REVALIDATE = 60 * 10
+CDN_CABECERA_CLAVES = 'Surrogate-Key'
+CDN = {
+    # webpage.cdn.PurgaFastly con FASTLY_SERVICE_ID y FASTLY_API_TOKEN; sin CDN, PurgaNula
+    'BACKEND': 'webpage.cdn.PurgaFastly' if os.getenv('FASTLY_SERVICE_ID') else 'webpage.cdn.PurgaNula',
+    'OPTIONS': {
+        'servicio': os.getenv('FASTLY_SERVICE_ID', ''),
+        'token': os.getenv('FASTLY_API_TOKEN', ''),
+    },
+}
+
+# Compresión de respuestas dinámicas (webpage.middleware.CompresionDinamicaMiddleware)
+COMPRESION_MIN_BYTES = 1024  # Las respuestas más pequeñas no compensan el costo
+COMPRESION_BROTLI_CALIDAD = 5  # Equilibrio entre tamaño y CPU para contenido generado
+COMPRESION_CACHE_MAX_BYTES = 512 * 1024
+COMPRESION_CACHE_TIMEOUT = 60 * 60
+
+# Exportaciones en streaming (webpage.exportacion): filas leídas por bloque del cursor
+EXPORTACION_CHUNK_SIZE = 2000
+
+# Retención de contactos (webpage.retencion, comando archivar_contactos): los contactos con más
+# de CONTACTOS_RETENCION_DIAS días pasan a ContactoArchivado en transacciones de un lote
+CONTACTOS_RETENCION_DIAS = int(os.getenv('CONTACTOS_RETENCION_DIAS', '365'))
+CONTACTOS_ARCHIVO_LOTE = 1000
+
+# Registro estructurado (webpage.registro): JSON por línea con request_id, ruta y duración.
+# El hilo de la petición solo encola; la escritura en stderr ocurre en el hilo de ManejadorCola.
+LOG_NIVEL = os.getenv('LOG_NIVEL', 'INFO').upper()
+LOG_MUESTREO_DEBUG = float(os.getenv('LOG_MUESTREO_DEBUG', '0.1'))  # Fracción de eventos DEBUG que se escriben
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'contexto': {'()': 'webpage.registro.FiltroContexto'},
+        'muestreo': {'()': 'webpage.registro.FiltroMuestreo', 'tasa': LOG_MUESTREO_DEBUG},
+    },
+    'formatters': {
+        'json': {'()': 'webpage.registro.FormatoJSON'},
+    },
+    'handlers': {
+        'cola': {
+            'class': 'webpage.registro.ManejadorCola',
+            'stream': 'ext://sys.stderr',
+            'formatter': 'json',
+            'filters': ['muestreo', 'contexto'],
+        },
+    },
+    'root': {'handlers': ['cola'], 'level': 'WARNING'},
+    'loggers': {
+        'webpage': {'level': LOG_NIVEL},
+        'Vmmodulares': {'level': LOG_NIVEL},
+        # Sin los handlers por defecto de Django (consola y mail_admins): todo va por la cola
+        'django': {'handlers': ['cola'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -21,6 +21,7 @@ from django.conf.urls.static import static
 from django.views.static import serve
 from django.urls import re_path
 from django.contrib.sitemaps.views import sitemap
+from webpage.cdn import CLAVE_CATALOGO, cache_publico
 from webpage.sitemaps import sitemaps
 
 urlpatterns = [
@@ -28,7 +29,7 @@ urlpatterns = [
     path('captcha/', include('captcha.urls')),
 
     # SEO URLs
-    path('sitemap.xml', sitemap, {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
+    path('sitemap.xml', cache_publico(claves=[CLAVE_CATALOGO])(sitemap), {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
 
     path('', include('webpage.urls')),
 ]
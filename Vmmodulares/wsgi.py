@@ -18,3 +18,7 @@ application = get_wsgi_application()
 # Asegurar que los directorios de medios existan en producción
 from webpage.apps import ensure_media_directories
 ensure_media_directories()
+
+# Precompilar las plantillas en el cargador cacheado antes de atender peticiones
+from webpage.plantillas import precompilar_plantillas
+precompilar_plantillas()
@@ -1,6 +1,24 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
 from django.utils.html import format_html
-from .models import Categoria, Subcategoria, FotosSubcategoria, Contacto
+from import_export.admin import ImportMixin
+from .busqueda import buscar_contactos
+from .exportacion import formatos_disponibles, respuesta_exportacion
+from .models import Categoria, Subcategoria, FotosSubcategoria, Contacto, ContactoArchivado
+from .resources import ContactoArchivadoResource, ContactoResource, FotosSubcategoriaResource
+from .retencion import restaurar_contactos
+
+
+def accion_exportar(formato):
+    """Acción de admin que exporta en streaming los objetos seleccionados (ver webpage.exportacion)"""
+    def exportar(modeladmin, request, queryset):
+        resource = modeladmin.resource_exportacion()
+        # La selección se pasa como subconsulta: el orden y los joins son los del resource
+        seleccion = resource.get_queryset().filter(pk__in=queryset.values('pk'))
+        return respuesta_exportacion(resource, seleccion, formato, modeladmin.model._meta.model_name)
+    exportar.__name__ = f'exportar_{formato}'
+    exportar.short_description = f"Exportar seleccionados a {formato.upper()}"
+    return exportar
 
 
 @admin.register(Categoria)
@@ -54,13 +72,17 @@ class SubcategoriaAdmin(admin.ModelAdmin):
 
 
 @admin.register(FotosSubcategoria)
-class FotosSubcategoriaAdmin(admin.ModelAdmin):
+class FotosSubcategoriaAdmin(ImportMixin, admin.ModelAdmin):
     list_display = ('vista_previa_mini', 'subcategoria', 'descripcion', 'orden', 'fecha_subida')
     list_filter = ('subcategoria__categoria', 'subcategoria', 'fecha_subida')
     search_fields = ('descripcion', 'subcategoria__nombre', 'subcategoria__categoria__nombre')
     ordering = ('subcategoria__categoria__nombre', 'subcategoria__nombre', 'orden')
     fields = ('subcategoria', 'imagen', 'vista_previa', 'descripcion', 'orden')
     readonly_fields = ('vista_previa', 'fecha_subida')
+    resource_exportacion = FotosSubcategoriaResource
+    # Importación del catálogo: validación y diff en seco antes de confirmar (ver FotosSubcategoriaResource)
+    resource_classes = [FotosSubcategoriaResource]
+    actions = [accion_exportar(formato) for formato in formatos_disponibles()]
     
     def vista_previa_mini(self, obj):
         if obj.imagen:
@@ -87,6 +109,15 @@ class FotosSubcategoriaAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
 
+class ContactoChangeList(ChangeList):
+    def get_queryset(self, request, exclude_parameters=None):
+        qs = super().get_queryset(request, exclude_parameters)
+        # Con búsqueda y sin orden elegido por columna, los resultados se ordenan por relevancia
+        if self.query and ORDER_VAR not in self.params:
+            qs = qs.order_by('-rango', '-fecha_contacto', '-pk')
+        return qs
+
+
 @admin.register(Contacto)
 class ContactoAdmin(admin.ModelAdmin):
     list_display = ('nombre', 'email', 'telefono', 'categoria', 'fecha_contacto', 'email_enviado')
@@ -95,6 +126,17 @@ class ContactoAdmin(admin.ModelAdmin):
     ordering = ('-fecha_contacto',)
     readonly_fields = ('fecha_contacto', 'mensaje')
     fields = ('nombre', 'email', 'telefono', 'categoria', 'mensaje', 'fecha_contacto', 'email_enviado')
+    resource_exportacion = ContactoResource
+    actions = [accion_exportar(formato) for formato in formatos_disponibles()]
+
+    def get_search_results(self, request, queryset, search_term):
+        # Búsqueda de texto completo indexada (ver webpage.busqueda) en lugar de icontains por campo
+        if not search_term:
+            return queryset, False
+        return buscar_contactos(queryset, search_term), False
+
+    def get_changelist(self, request, **kwargs):
+        return ContactoChangeList
 
     def mensaje(self, obj):
         # Mostrar el mensaje con formato de texto largo
@@ -110,6 +152,30 @@ class ContactoAdmin(admin.ModelAdmin):
         return True
 
 
+@admin.register(ContactoArchivado)
+class ContactoArchivadoAdmin(admin.ModelAdmin):
+    """Archivo de contactos (ver webpage.retencion): solo consulta, exportación y restauración"""
+    list_display = ('nombre', 'email', 'telefono', 'categoria', 'fecha_contacto', 'email_enviado')
+    search_fields = ('nombre', 'email', 'telefono', 'categoria', 'mensaje')
+    ordering = ('-fecha_contacto',)
+    # Sin filtros laterales ni conteo total en las búsquedas: cada uno recorre todo el archivo
+    show_full_result_count = False
+    resource_exportacion = ContactoArchivadoResource
+    actions = [accion_exportar(formato) for formato in formatos_disponibles()] + ['restaurar']
+
+    @admin.action(description="Restaurar seleccionados a Contactos", permissions=['delete'])
+    def restaurar(self, request, queryset):
+        total = restaurar_contactos(queryset)
+        self.message_user(request, f"{total} contactos restaurados.")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        # Solo lectura: los contactos se editan en la tabla principal
+        return False
+
+
 # Personalización del admin site
 admin.site.site_header = "Administración VM Modulares"
 admin.site.site_title = "VM Modulares Admin"
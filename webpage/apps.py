@@ -1,7 +1,10 @@
 from django.apps import AppConfig
+import logging
 import os
 from django.conf import settings
 
+logger = logging.getLogger(__name__)
+
 
 def ensure_media_directories():
     """
@@ -12,27 +15,27 @@ def ensure_media_directories():
     if not settings.DEBUG:
         if os.path.exists('/media'):
             if os.path.ismount('/media'):
-                print("✓ Usando volumen persistente de Railway: /media")
+                logger.info("Usando volumen persistente de Railway: /media")
             else:
-                print("⚠ Directorio /media existe pero no está montado como volumen")
+                logger.warning("Directorio /media existe pero no está montado como volumen")
         else:
-            print("⚠ Directorio /media no existe")
+            logger.warning("Directorio /media no existe")
 
-    print(f"MEDIA_ROOT configurado como: {settings.MEDIA_ROOT}")
+    logger.info("MEDIA_ROOT configurado", extra={'media_root': settings.MEDIA_ROOT})
 
     # Asegurar que MEDIA_ROOT existe
     if not os.path.exists(settings.MEDIA_ROOT):
         try:
             os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
-            print(f"✓ Directorio raíz de media creado: {settings.MEDIA_ROOT}")
+            logger.info("Directorio raíz de media creado", extra={'directorio': settings.MEDIA_ROOT})
         except PermissionError:
-            print(f"❌ Error: No se pudo crear {settings.MEDIA_ROOT}. Verificar permisos del volumen.")
+            logger.error("No se pudo crear el directorio raíz de media: verificar permisos del volumen", extra={'directorio': settings.MEDIA_ROOT})
             return
-        except Exception as e:
-            print(f"❌ Error inesperado creando {settings.MEDIA_ROOT}: {e}")
+        except Exception:
+            logger.exception("Error inesperado creando el directorio raíz de media", extra={'directorio': settings.MEDIA_ROOT})
             return
     else:
-        print(f"✓ Directorio raíz de media ya existe: {settings.MEDIA_ROOT}")
+        logger.debug("Directorio raíz de media ya existe", extra={'directorio': settings.MEDIA_ROOT})
 
     directories = [
         'empresa',
@@ -44,13 +47,13 @@ def ensure_media_directories():
         if not os.path.exists(directory_path):
             try:
                 os.makedirs(directory_path, exist_ok=True)
-                print(f"✓ Directorio creado: {directory_path}")
+                logger.info("Directorio de media creado", extra={'directorio': directory_path})
             except PermissionError:
-                print(f"❌ Error: No se pudo crear {directory_path}. Verificar permisos.")
-            except Exception as e:
-                print(f"❌ Error inesperado creando {directory_path}: {e}")
+                logger.error("No se pudo crear el directorio de media: verificar permisos", extra={'directorio': directory_path})
+            except Exception:
+                logger.exception("Error inesperado creando el directorio de media", extra={'directorio': directory_path})
         else:
-            print(f"✓ Directorio ya existe: {directory_path}")
+            logger.debug("Directorio de media ya existe", extra={'directorio': directory_path})
 
 
 class WebpageConfig(AppConfig):
@@ -58,6 +61,9 @@ class WebpageConfig(AppConfig):
     name = 'webpage'
 
     def ready(self):
+        # Registrar señales de invalidación del catálogo
+        from . import signals  # noqa: F401
+
         # Solo crear directorios si no estamos en migraciones
         import sys
         if 'migrate' not in sys.argv and 'makemigrations' not in sys.argv:
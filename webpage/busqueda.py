@@ -0,0 +1,62 @@
+import re
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+
+# Pesos de bm25 en SQLite por columna de webpage_contacto_fts, en el mismo orden
+# (nombre, email, telefono, categoria, mensaje); equivalen a los pesos A/B/C de PostgreSQL
+_PESOS_FTS5 = '10.0, 10.0, 10.0, 4.0, 1.0'
+
+# Relevancia de cada fila. Un bm25 correlacionado por fila reevalúa la consulta FTS5 por cada
+# coincidencia (segundos con miles de filas); el LIMIT -1 impide que SQLite aplane el
+# subquery, así lo calcula una vez y lo busca por id con un índice automático
+_RANGO_FTS5 = (
+    f"SELECT r.rango FROM (SELECT rowid AS id, -bm25(webpage_contacto_fts, {_PESOS_FTS5}) AS rango "
+    f"FROM webpage_contacto_fts WHERE webpage_contacto_fts MATCH %s LIMIT -1) AS r "
+    f"WHERE r.id = webpage_contacto.id"
+)
+
+
+def _consulta_fts5(termino):
+    """Cada palabra entre comillas (sin operadores FTS5 del usuario) y como prefijo: todas deben aparecer"""
+    palabras = re.findall(r'\w+', termino)
+    return ' '.join(f'"{palabra}"*' for palabra in palabras)
+
+
+def buscar_contactos(queryset, termino):
+    """
+    Filtra `queryset` de Contacto por `termino` con el índice de texto completo y anota `rango`
+    (relevancia, mayor es mejor). Los fragmentos de email y teléfono se buscan con icontains,
+    cubierto por los índices de trigramas en PostgreSQL.
+    Ver la migración 0008_busqueda_contacto.
+    """
+    termino = termino.strip()
+    if not termino:
+        return queryset.annotate(rango=Value(0.0, output_field=FloatField()))
+    fragmentos = Q(email__icontains=termino) | Q(telefono__icontains=termino)
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+
+        vector = RawSQL('webpage_contacto.busqueda', [], output_field=SearchVectorField())
+        consulta = SearchQuery(termino, config='spanish', search_type='websearch')
+        return (queryset.alias(vector=vector).annotate(rango=SearchRank(vector, consulta))
+                .filter(Q(vector=consulta) | fragmentos))
+
+    if connection.vendor == 'sqlite':
+        consulta = _consulta_fts5(termino)
+        if not consulta:
+            return queryset.filter(fragmentos).annotate(rango=Value(0.0, output_field=FloatField()))
+        # Filtro, orden y paginación en SQL: el admin cuenta y pagina todas las coincidencias
+        coincidencias = RawSQL("SELECT rowid FROM webpage_contacto_fts WHERE webpage_contacto_fts MATCH %s",
+                               [consulta])
+        rango = Coalesce(RawSQL(_RANGO_FTS5, [consulta], output_field=FloatField()), Value(0.0))
+        return queryset.filter(Q(id__in=coincidencias) | fragmentos).annotate(rango=rango)
+
+    # Otros motores: búsqueda simple sin índice
+    campos = ('nombre', 'email', 'telefono', 'categoria', 'mensaje')
+    filtro = Q()
+    for campo in campos:
+        filtro |= Q(**{f'{campo}__icontains': termino})
+    return queryset.filter(filtro).annotate(rango=Value(0.0, output_field=FloatField()))
@@ -0,0 +1,254 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Un get solo reescribe la fecha de acceso si tiene más de estos segundos: el LRU es aproximado,
+# pero las lecturas repetidas no compiten por el bloqueo de escritura de SQLite
+_RESOLUCION_ACCESO = 30
+
+# Se incrementa cuando hay que corregir datos de archivos de caché ya creados (PRAGMA user_version)
+_VERSION_ESQUEMA = 1
+
+_ESQUEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS cache (
+        clave TEXT PRIMARY KEY,
+        valor BLOB NOT NULL,
+        expira REAL,
+        acceso REAL NOT NULL,
+        tamano INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS cache_acceso_idx ON cache (acceso)",
+    "CREATE INDEX IF NOT EXISTS cache_expira_idx ON cache (expira) WHERE expira IS NOT NULL",
+    # Totales mantenidos por triggers: comprobar el límite no recorre la tabla
+    "CREATE TABLE IF NOT EXISTS cache_totales (id INTEGER PRIMARY KEY CHECK (id = 1), entradas INTEGER, bytes INTEGER)",
+    "INSERT OR IGNORE INTO cache_totales VALUES (1, 0, 0)",
+    """
+    CREATE TRIGGER IF NOT EXISTS cache_totales_ai AFTER INSERT ON cache BEGIN
+        UPDATE cache_totales SET entradas = entradas + 1, bytes = bytes + new.tamano;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS cache_totales_ad AFTER DELETE ON cache BEGIN
+        UPDATE cache_totales SET entradas = entradas - 1, bytes = bytes - old.tamano;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS cache_totales_au AFTER UPDATE OF tamano ON cache BEGIN
+        UPDATE cache_totales SET bytes = bytes - old.tamano + new.tamano;
+    END
+    """,
+]
+
+
+class CacheSQLite(BaseCache):
+    """
+    Caché compartida por los workers de gunicorn de un mismo host, sin servicios externos:
+    un archivo SQLite en modo WAL (lectores concurrentes sin bloquear al escritor) leído con
+    mmap. Expira por TTL, desaloja por LRU aproximado al superar MAX_ENTRIES o MAX_BYTES, e
+    incr()/decr() son atómicos entre procesos, así que sirven como contadores de versión.
+
+    Los enteros se guardan como INTEGER de SQLite (para poder incrementarlos en SQL) y el
+    resto de valores con pickle, igual que las cachés de Django.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._ruta = location
+        self._max_bytes = int(options.get('MAX_BYTES', 64 * 1024 * 1024))
+        self._mmap_bytes = int(options.get('MMAP_BYTES', self._max_bytes * 2))
+        self._local = threading.local()
+
+    # Conexión por hilo y por proceso: las conexiones abiertas antes del fork de gunicorn
+    # (--preload) no deben compartirse entre workers
+    def _conexion(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is not None and self._local.pid == os.getpid():
+            return conexion
+        directorio = os.path.dirname(self._ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        conexion = sqlite3.connect(self._ruta, timeout=5, isolation_level=None, check_same_thread=False)
+        conexion.execute('PRAGMA journal_mode=WAL')
+        conexion.execute('PRAGMA synchronous=NORMAL')
+        conexion.execute(f'PRAGMA mmap_size={self._mmap_bytes}')
+        with _transaccion(conexion):
+            for sentencia in _ESQUEMA:
+                conexion.execute(sentencia)
+            if conexion.execute('PRAGMA user_version').fetchone()[0] < _VERSION_ESQUEMA:
+                # Los totales de versiones anteriores pudieron desviarse: recalcularlos una vez
+                conexion.execute(
+                    "UPDATE cache_totales SET entradas = (SELECT COUNT(*) FROM cache), "
+                    "bytes = (SELECT COALESCE(SUM(tamano), 0) FROM cache)"
+                )
+                conexion.execute(f'PRAGMA user_version = {_VERSION_ESQUEMA}')
+        self._local.conexion, self._local.pid = conexion, os.getpid()
+        return conexion
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        claves = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not claves:
+            return {}
+        ahora = time.time()
+        conexion = self._conexion()
+        filas = conexion.execute(
+            f"SELECT clave, valor, expira, acceso FROM cache WHERE clave IN ({', '.join('?' * len(claves))})",
+            list(claves),
+        ).fetchall()
+        resultado, vencidas, accedidas = {}, [], []
+        for clave, valor, expira, acceso in filas:
+            if expira is not None and expira <= ahora:
+                vencidas.append(clave)
+                continue
+            resultado[claves[clave]] = _cargar(valor)
+            if ahora - acceso > _RESOLUCION_ACCESO:
+                accedidas.append(clave)
+        if vencidas or accedidas:
+            with _transaccion(conexion):
+                conexion.executemany("DELETE FROM cache WHERE clave = ? AND expira <= ?",
+                                     [(clave, ahora) for clave in vencidas])
+                conexion.executemany("UPDATE cache SET acceso = ? WHERE clave = ?",
+                                     [(ahora, clave) for clave in accedidas])
+        return resultado
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout=timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expira = self.get_backend_timeout(timeout)
+        ahora = time.time()
+        filas = []
+        for key, value in data.items():
+            valor = _volcar(value)
+            filas.append((self.make_and_validate_key(key, version=version), valor, expira, ahora, _tamano(valor)))
+        conexion = self._conexion()
+        with _transaccion(conexion):
+            # Upsert y no INSERT OR REPLACE: el REPLACE borra la fila anterior sin disparar
+            # cache_totales_ad y los totales crecerían con cada sobrescritura
+            conexion.executemany(
+                "INSERT INTO cache VALUES (?, ?, ?, ?, ?) ON CONFLICT (clave) DO UPDATE SET "
+                "valor = excluded.valor, expira = excluded.expira, acceso = excluded.acceso, tamano = excluded.tamano",
+                filas,
+            )
+            self._cull(conexion, ahora)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        clave = self.make_and_validate_key(key, version=version)
+        valor = _volcar(value)
+        ahora = time.time()
+        conexion = self._conexion()
+        with _transaccion(conexion):
+            conexion.execute("DELETE FROM cache WHERE clave = ? AND expira <= ?", (clave, ahora))
+            cursor = conexion.execute(
+                "INSERT OR IGNORE INTO cache VALUES (?, ?, ?, ?, ?)",
+                (clave, valor, self.get_backend_timeout(timeout), ahora, _tamano(valor)),
+            )
+            if cursor.rowcount:
+                self._cull(conexion, ahora)
+        return bool(cursor.rowcount)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        clave = self.make_and_validate_key(key, version=version)
+        ahora = time.time()
+        cursor = self._conexion().execute(
+            "UPDATE cache SET expira = ?, acceso = ? WHERE clave = ? AND (expira IS NULL OR expira > ?)",
+            (self.get_backend_timeout(timeout), ahora, clave, ahora),
+        )
+        return bool(cursor.rowcount)
+
+    def incr(self, key, delta=1, version=None):
+        """Incremento atómico en SQL: dos workers que incrementan a la vez no pierden ninguno"""
+        clave = self.make_and_validate_key(key, version=version)
+        ahora = time.time()
+        fila = self._conexion().execute(
+            "UPDATE cache SET valor = valor + ?, acceso = ? "
+            "WHERE clave = ? AND typeof(valor) = 'integer' AND (expira IS NULL OR expira > ?) RETURNING valor",
+            (delta, ahora, clave, ahora),
+        ).fetchall()  # Consumir el cursor: hasta entonces la sentencia retiene el bloqueo de escritura
+        if not fila:
+            raise ValueError("Key '%s' not found" % key)
+        return fila[0][0]
+
+    def delete(self, key, version=None):
+        return self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        claves = [self.make_and_validate_key(key, version=version) for key in keys]
+        if not claves:
+            return False
+        cursor = self._conexion().execute(
+            f"DELETE FROM cache WHERE clave IN ({', '.join('?' * len(claves))})", claves,
+        )
+        return bool(cursor.rowcount)
+
+    def has_key(self, key, version=None):
+        clave = self.make_and_validate_key(key, version=version)
+        fila = self._conexion().execute(
+            "SELECT 1 FROM cache WHERE clave = ? AND (expira IS NULL OR expira > ?)", (clave, time.time()),
+        ).fetchone()
+        return fila is not None
+
+    def clear(self):
+        self._conexion().execute("DELETE FROM cache")
+
+    def close(self, **kwargs):
+        # La conexión se reutiliza entre peticiones del mismo hilo
+        pass
+
+    def _cull(self, conexion, ahora):
+        """Si se superó algún límite: primero las entradas vencidas, luego las menos usadas (hasta el 90 %)"""
+        entradas, total = conexion.execute("SELECT entradas, bytes FROM cache_totales").fetchone()
+        if entradas <= self._max_entries and total <= self._max_bytes:
+            return
+        conexion.execute("DELETE FROM cache WHERE expira <= ?", (ahora,))
+        entradas, total = conexion.execute("SELECT entradas, bytes FROM cache_totales").fetchone()
+        if entradas > self._max_entries:
+            conexion.execute(
+                "DELETE FROM cache WHERE clave IN (SELECT clave FROM cache ORDER BY acceso LIMIT ?)",
+                (entradas - int(self._max_entries * 0.9),),
+            )
+        if total > self._max_bytes:
+            # Conserva las más recientes mientras el acumulado quepa en el 90 % del límite
+            conexion.execute(
+                "DELETE FROM cache WHERE clave IN (SELECT clave FROM ("
+                "SELECT clave, SUM(tamano) OVER (ORDER BY acceso DESC, clave) AS acumulado FROM cache"
+                ") WHERE acumulado > ?)",
+                (int(self._max_bytes * 0.9),),
+            )
+
+
+class _transaccion:
+    """BEGIN IMMEDIATE: toma el bloqueo de escritura al empezar y evita interbloqueos entre workers"""
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def __enter__(self):
+        self.conexion.execute('BEGIN IMMEDIATE')
+
+    def __exit__(self, tipo, *args):
+        self.conexion.execute('ROLLBACK' if tipo else 'COMMIT')
+
+
+def _volcar(value):
+    # bool es subclase de int: solo los int "de verdad" (y que caben en 64 bits) van como INTEGER
+    if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+        return value
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def _cargar(valor):
+    return valor if isinstance(valor, int) else pickle.loads(valor)
+
+
+def _tamano(valor):
+    return 8 if isinstance(valor, int) else len(valor)
@@ -0,0 +1,233 @@
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils.text import slugify
+from .models import Categoria, FotosSubcategoria, Subcategoria
+
+# Orden de los tipos de resultado cuando la coincidencia es igual de buena
+_PESO_TIPO = {'subcategoria': 3, 'categoria': 2, 'foto': 1}
+_MIN_PREFIJO = 2
+_UMBRAL_TRIGRAMAS = 0.4
+# Candidatos que se recorren como mucho por consulta (las fotos repetidas se descartan después)
+_MAX_CANDIDATOS = 200
+
+# Contador compartido por los workers (caché de webpage.cache): cambia con cada cambio del catálogo
+CLAVE_VERSION_CATALOGO = 'catalogo:version'
+
+_lock = threading.Lock()
+_indice = None
+_desactualizado = True
+_revalidado = 0.0
+_version = None
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes ni diéresis (la ñ queda como n): 'Baños' -> 'banos'"""
+    texto = unicodedata.normalize('NFKD', texto or '').lower()
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def palabras(texto):
+    return re.findall(r'\w+', normalizar(texto))
+
+
+def trigramas(palabra):
+    """Trigramas al estilo pg_trgm: la palabra con dos espacios delante y uno detrás"""
+    palabra = f'  {palabra} '
+    return {palabra[i:i + 3] for i in range(len(palabra) - 2)}
+
+
+class IndiceCatalogo:
+    """
+    Índice inmutable del catálogo: un documento por categoría, subcategoría y foto con
+    descripción propia. Se reemplaza entero al reconstruirse, así que las consultas
+    concurrentes no necesitan lock.
+
+    Los documentos se numeran en orden de relevancia (subcategorías, categorías y fotos; los
+    textos cortos primero) y cada lista de ids está ordenada, así que los mejores resultados
+    son los ids más bajos de la intersección y no hace falta puntuar cada coincidencia.
+    """
+
+    def __init__(self, documentos, huella):
+        self.documentos = sorted(documentos, key=lambda d: (-_PESO_TIPO[d['tipo']], len(d['texto']), d['texto']))
+        self.huella = huella
+        exactas, prefijos, vocabulario = defaultdict(list), defaultdict(set), defaultdict(set)
+        for doc_id, documento in enumerate(self.documentos):
+            for palabra in documento.pop('palabras'):
+                exactas[palabra].append(doc_id)
+                for fin in range(_MIN_PREFIJO, len(palabra) + 1):
+                    prefijos[palabra[:fin]].add(doc_id)
+        for palabra in exactas:
+            for trigrama in trigramas(palabra):
+                vocabulario[trigrama].add(palabra)
+        self.exactas = {palabra: tuple(ids) for palabra, ids in exactas.items()}
+        self.prefijos = {prefijo: tuple(sorted(ids)) for prefijo, ids in prefijos.items()}
+        # Trigramas de las palabras (no de los documentos) para corregir errores de escritura
+        self.vocabulario = {trigrama: tuple(palabras_) for trigrama, palabras_ in vocabulario.items()}
+
+    def buscar(self, termino, limite=8):
+        consulta = [p for p in dict.fromkeys(palabras(termino)) if len(p) >= _MIN_PREFIJO]
+        if not consulta:
+            return []
+
+        # Primero los documentos con todas las palabras completas, después como prefijo
+        # (el texto que se está escribiendo); si no hay ninguno, palabras parecidas
+        ids = list(_interseccion([self.exactas.get(palabra, ()) for palabra in consulta]))
+        if len(ids) < limite * 2:
+            listas = [self.prefijos.get(palabra, ()) for palabra in consulta]
+            if not all(listas):
+                listas = [lista or self._parecidas(palabra) for lista, palabra in zip(listas, consulta)]
+            vistos = set(ids)
+            ids.extend(doc_id for doc_id in _interseccion(listas) if doc_id not in vistos)
+
+        resultados, subcategorias = [], set()
+        for doc_id in ids:
+            documento = self.documentos[doc_id]
+            # Una foto no aporta nada si su subcategoría ya está en los resultados
+            if documento['tipo'] == 'foto' and documento['subcategoria_id'] in subcategorias:
+                continue
+            if documento['subcategoria_id']:
+                subcategorias.add(documento['subcategoria_id'])
+            resultados.append(documento)
+            if len(resultados) == limite:
+                break
+        return resultados
+
+    def _parecidas(self, palabra, maximo=3):
+        """Documentos de las palabras del índice con más trigramas en común con `palabra`"""
+        buscados = trigramas(palabra)
+        compartidos = Counter()
+        for trigrama in buscados:
+            compartidos.update(self.vocabulario.get(trigrama, ()))
+        candidatas = [
+            candidata for candidata, n in compartidos.most_common()
+            if n / len(buscados | trigramas(candidata)) >= _UMBRAL_TRIGRAMAS
+        ][:maximo]
+        return tuple(sorted(set().union(*(self.exactas[c] for c in candidatas))))
+
+
+def _interseccion(listas, maximo=_MAX_CANDIDATOS):
+    """Los primeros `maximo` ids presentes en todas las listas ordenadas, en orden"""
+    if not listas or not all(listas):
+        return []
+    if len(listas) == 1:
+        return listas[0][:maximo]
+    listas = sorted(listas, key=len)
+    # La intersección de conjuntos recorre las listas en C: más rápido que buscar id por id
+    comunes = set(listas[0])
+    for lista in listas[1:]:
+        comunes.intersection_update(lista)
+        if not comunes:
+            return []
+    return heapq.nsmallest(maximo, comunes)
+
+
+def _huella_catalogo():
+    """
+    Cambia con cualquier modificación del catálogo: las señales incrementan Categoria.version.
+    El id máximo distingue borrar una categoría y crear otra (mismo total y suma de versiones).
+    """
+    datos = Categoria.objects.aggregate(total=Count('id'), versiones=Sum('version'), ultimo=Max('id'))
+    return datos['total'], datos['versiones'] or 0, datos['ultimo'] or 0
+
+
+def version_catalogo():
+    """Versión pública del catálogo ('total-versiones-último'): el service worker la usa para purgar su caché"""
+    return '-'.join(map(str, _huella_catalogo()))
+
+
+def _construir(huella):
+    from .views import obtener_fotos_destacadas
+
+    destacadas = obtener_fotos_destacadas()
+    documentos = []
+    for categoria in Categoria.objects.order_by('nombre'):
+        documentos.append({
+            'tipo': 'categoria', 'texto': categoria.nombre, 'categoria': categoria.nombre,
+            'categoria_slug': slugify(categoria.nombre.lower()), 'subcategoria_id': None,
+            'imagen_url': '', 'palabras': set(palabras(categoria.nombre)),
+        })
+    for subcategoria in Subcategoria.objects.select_related('categoria').order_by('nombre'):
+        foto = destacadas.get(subcategoria.id)
+        documentos.append({
+            'tipo': 'subcategoria', 'texto': subcategoria.nombre, 'categoria': subcategoria.categoria.nombre,
+            'categoria_slug': slugify(subcategoria.categoria.nombre.lower()), 'subcategoria_id': subcategoria.id,
+            'imagen_url': foto.imagen.url if foto and foto.imagen else '',
+            # La categoría también cuenta: "cocina hogar" encuentra las cocinas de HOGAR
+            'palabras': set(palabras(subcategoria.nombre)) | set(palabras(subcategoria.categoria.nombre)),
+        })
+    fotos = (FotosSubcategoria.objects.select_related('subcategoria__categoria')
+             .exclude(descripcion__isnull=True).exclude(descripcion=''))
+    for foto in fotos.iterator():
+        # save() copia el nombre de la subcategoría en las fotos sin descripción: ya está indexada
+        if normalizar(foto.descripcion) == normalizar(foto.subcategoria.nombre):
+            continue
+        categoria = foto.subcategoria.categoria.nombre
+        documentos.append({
+            'tipo': 'foto', 'texto': foto.descripcion, 'categoria': categoria,
+            'categoria_slug': slugify(categoria.lower()), 'subcategoria_id': foto.subcategoria_id,
+            'imagen_url': foto.imagen.url if foto.imagen else '',
+            'palabras': set(palabras(foto.descripcion)),
+        })
+    return IndiceCatalogo(documentos, huella)
+
+
+def obtener_indice():
+    """
+    Devuelve el índice de este proceso y lo reconstruye si está desactualizado: si la versión
+    compartida del catálogo cambió (otro worker guardó un cambio) o, por si la caché perdió el
+    contador, como mucho cada CATALOGO_BUSQUEDA_REVALIDAR segundos comparando la huella en la
+    base de datos. Mientras un hilo reconstruye, los demás siguen respondiendo con el índice
+    anterior.
+    """
+    global _indice, _desactualizado, _revalidado, _version
+    version = cache.get(CLAVE_VERSION_CATALOGO)
+    if _indice is not None and not _vencido(version):
+        return _indice
+    if not _lock.acquire(blocking=_indice is None):
+        return _indice
+    try:
+        if _indice is None or _vencido(version):
+            _desactualizado, _version = False, version
+            huella = _huella_catalogo()
+            if _indice is None or _indice.huella != huella:
+                _indice = _construir(huella)
+            _revalidado = time.monotonic()
+    finally:
+        _lock.release()
+    return _indice
+
+
+def _vencido(version):
+    return (_desactualizado or version != _version
+            or time.monotonic() - _revalidado >= settings.CATALOGO_BUSQUEDA_REVALIDAR)
+
+
+def incrementar_version_catalogo():
+    """Incremento atómico entre workers; add() crea el contador si no existe o se desalojó"""
+    cache.add(CLAVE_VERSION_CATALOGO, 0, timeout=None)
+    try:
+        return cache.incr(CLAVE_VERSION_CATALOGO)
+    except ValueError:
+        # Desalojado entre add() e incr(): lo recrea el siguiente cambio
+        return None
+
+
+def marcar_desactualizado():
+    """Fuerza la reconstrucción en la próxima búsqueda de todos los workers, tras el commit del cambio"""
+    def marcar():
+        global _desactualizado
+        _desactualizado = True
+        incrementar_version_catalogo()
+    transaction.on_commit(marcar)
+
+
+def buscar_catalogo(termino, limite=8):
+    return obtener_indice().buscar(termino, limite)
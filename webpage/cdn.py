@@ -0,0 +1,159 @@
+import json
+import logging
+import urllib.error
+import urllib.request
+from functools import wraps
+from django.conf import settings
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Claves de sustitución (Surrogate-Key): la CDN purga todas las respuestas que llevan una clave.
+# 'catalogo' marca las páginas que listan todo el catálogo (home, sitemap, búsqueda); las claves
+# por categoría y subcategoría marcan la API de fotos, para no purgarla entera por cada foto.
+CLAVE_CATALOGO = 'catalogo'
+
+
+def clave_categoria(categoria_id):
+    return f'categoria-{categoria_id}'
+
+
+def clave_subcategoria(subcategoria_id):
+    return f'subcategoria-{subcategoria_id}'
+
+
+def agregar_claves(response, claves):
+    """Añade claves a la cabecera Surrogate-Key de la respuesta (separadas por espacios, sin repetir)"""
+    actuales = response.get(settings.CDN_CABECERA_CLAVES, '').split()
+    response[settings.CDN_CABECERA_CLAVES] = ' '.join(dict.fromkeys(actuales + list(claves)))
+    return response
+
+
+def cache_publico(claves=()):
+    """
+    Decorador para vistas cuya respuesta es igual para todos los visitantes anónimos: las 200 de
+    GET/HEAD se marcan cacheables por la CDN (s-maxage + stale-while-revalidate) con las claves
+    indicadas; el navegador revalida (max-age=CDN_MAX_AGE) para ver pronto lo que se purgó.
+    Si la respuesta fija cookies o varía por Cookie no se marca: sería de un solo visitante.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            response = vista(request, *args, **kwargs)
+            if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+                return response
+            if response.cookies or 'cookie' in response.get('Vary', '').lower():
+                return response
+            patch_cache_control(
+                response,
+                public=True,
+                max_age=settings.CDN_MAX_AGE,
+                s_maxage=settings.CDN_S_MAXAGE,
+                stale_while_revalidate=settings.CDN_STALE_WHILE_REVALIDATE,
+            )
+            return agregar_claves(response, claves)
+        return envoltura
+    return decorador
+
+
+class PurgaCDN:
+    """Interfaz de los backends de purga (settings.CDN['BACKEND'])"""
+
+    def __init__(self, **options):
+        self.options = options
+
+    def purgar(self, claves):
+        raise NotImplementedError
+
+
+class PurgaNula(PurgaCDN):
+    """Sin CDN delante: solo registra lo que se habría purgado"""
+
+    def purgar(self, claves):
+        logger.debug("Purga CDN omitida (sin CDN configurada)", extra={'claves': claves})
+
+
+class PurgaFastly(PurgaCDN):
+    """
+    Purga por Surrogate-Key con la API de Fastly (OPTIONS: servicio, token), sin dependencias
+    externas. Fastly acepta hasta 256 claves por petición.
+    """
+    URL = 'https://api.fastly.com/service/{servicio}/purge'
+
+    def purgar(self, claves):
+        claves = list(claves)
+        for inicio in range(0, len(claves), 256):
+            bloque = claves[inicio:inicio + 256]
+            peticion = urllib.request.Request(
+                self.URL.format(servicio=self.options['servicio']),
+                data=json.dumps({'surrogate_keys': bloque}).encode('utf-8'),
+                headers={'Fastly-Key': self.options['token'], 'Content-Type': 'application/json',
+                         'Accept': 'application/json'},
+                method='POST',
+            )
+            with urllib.request.urlopen(peticion, timeout=5):
+                pass
+        logger.info("Purga CDN enviada", extra={'claves': claves})
+
+
+_backend = None
+_configuracion = None
+
+
+def obtener_backend():
+    """Instancia del backend configurado; se conserva mientras settings.CDN no cambie"""
+    global _backend, _configuracion
+    if _backend is None or _configuracion is not settings.CDN:
+        _configuracion = settings.CDN
+        _backend = import_string(settings.CDN['BACKEND'])(**settings.CDN.get('OPTIONS', {}))
+    return _backend
+
+
+def purgar(*claves):
+    """
+    Programa la purga de `claves` para cuando se confirme la transacción: todas las de una
+    misma transacción (por ejemplo un guardado del admin con sus inlines) van en un solo envío.
+    Si la transacción se revierte, Django descarta el envío y sus claves con él.
+    """
+    conexion = transaction.get_connection()
+    lote = getattr(conexion, 'lote_purga_cdn', None)
+    if lote is not None and conexion.in_atomic_block and _envio_pendiente(conexion, lote):
+        lote.claves.update(claves)
+        return
+    # Sin envío pendiente en esta transacción (o la anterior se revirtió): uno nuevo
+    lote = conexion.lote_purga_cdn = _LotePurga(conexion)
+    lote.claves.update(claves)
+    transaction.on_commit(lote)
+
+
+def _envio_pendiente(conexion, lote):
+    """
+    True si `lote` sigue registrado en on_commit, es decir, si ningún rollback lo descartó.
+    Django no expone esa lista: se inspecciona run_on_commit (tuplas que contienen la función)
+    y, si su forma no es la esperada, se responde False y purgar() empieza otro envío, que a
+    lo sumo repite claves.
+    """
+    try:
+        return any(lote in hook for hook in conexion.run_on_commit)
+    except (AttributeError, TypeError):
+        return False
+
+
+class _LotePurga:
+    """Claves acumuladas en una transacción; se llama (y envía) una sola vez, tras el commit"""
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.claves = set()
+
+    def __call__(self):
+        if getattr(self.conexion, 'lote_purga_cdn', None) is self:
+            self.conexion.lote_purga_cdn = None
+        claves = sorted(self.claves)
+        try:
+            obtener_backend().purgar(claves)
+        except (urllib.error.URLError, OSError, KeyError) as e:
+            # La respuesta expirará sola (s-maxage): no fallar el guardado por la CDN
+            logger.error("Error purgando la CDN", extra={'claves': claves, 'error': str(e)})
@@ -0,0 +1,120 @@
+import csv
+import datetime
+import json
+import tempfile
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # Sin openpyxl no se ofrece exportación XLSX
+    Workbook = None
+
+FORMATOS_EXPORTACION = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve cada línea en vez de acumularla"""
+
+    def write(self, valor):
+        return valor
+
+
+def filtrar_por_fechas(queryset, campo, desde=None, hasta=None):
+    """
+    Filtra `campo` entre las fechas `desde` y `hasta` (ambas incluidas) en SQL.
+    Se compara contra límites datetime en vez de usar __date, que envuelve la columna en una
+    función y no aprovecha los índices por fecha.
+    """
+    zona = timezone.get_current_timezone()
+    if desde:
+        inicio = datetime.datetime.combine(desde, datetime.time.min)
+        queryset = queryset.filter(**{f'{campo}__gte': timezone.make_aware(inicio, zona)})
+    if hasta:
+        fin = datetime.datetime.combine(hasta + datetime.timedelta(days=1), datetime.time.min)
+        queryset = queryset.filter(**{f'{campo}__lt': timezone.make_aware(fin, zona)})
+    return queryset
+
+
+def filas_exportacion(resource, queryset, chunk_size=None, nativo=False):
+    """
+    Genera la cabecera y luego una fila por objeto, leyendo el queryset por bloques
+    (cursor del lado del servidor en PostgreSQL) para que la memoria no crezca con el volumen.
+    Con nativo=True los widgets devuelven tipos Python (fechas en hora local, booleanos) en vez de texto.
+    """
+    chunk_size = chunk_size or settings.EXPORTACION_CHUNK_SIZE
+    yield resource.get_export_headers()
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        yield resource.export_resource(obj, force_native_type=nativo)
+
+
+def _json(valor):
+    if isinstance(valor, (datetime.date, datetime.time)):
+        return valor.isoformat()
+    return str(valor)
+
+
+def generar_csv(filas):
+    escritor = csv.writer(_Eco())
+    for fila in filas:
+        yield escritor.writerow(fila)
+
+
+def generar_jsonl(filas):
+    cabecera = next(filas)
+    for fila in filas:
+        yield json.dumps(dict(zip(cabecera, fila)), ensure_ascii=False, default=_json) + '\n'
+
+
+def escribir_xlsx(filas, destino):
+    """Escribe un XLSX en modo write_only: openpyxl vuelca las filas a disco a medida que llegan"""
+    if Workbook is None:
+        raise ValueError("La exportación XLSX requiere openpyxl.")
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet()
+    for fila in filas:
+        hoja.append(fila)
+    libro.save(destino)
+
+
+def escribir_exportacion(resource, queryset, formato, destino, chunk_size=None):
+    """Escribe la exportación en el archivo binario `destino` (comando de gestión)"""
+    filas = filas_exportacion(resource, queryset, chunk_size, nativo=formato != 'csv')
+    if formato == 'xlsx':
+        escribir_xlsx(filas, destino)
+        return
+    generador = generar_csv(filas) if formato == 'csv' else generar_jsonl(filas)
+    for parte in generador:
+        destino.write(parte.encode('utf-8'))
+
+
+def respuesta_exportacion(resource, queryset, formato, nombre, chunk_size=None):
+    """
+    Devuelve la exportación como respuesta en streaming.
+    CSV y JSONL se generan fila a fila; XLSX se escribe en un archivo temporal y se envía por bloques.
+    """
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError(f"Formato de exportación no soportado: {formato}")
+    filas = filas_exportacion(resource, queryset, chunk_size, nativo=formato != 'csv')
+    nombre_archivo = f"{nombre}-{timezone.localdate():%Y%m%d}.{formato}"
+
+    if formato == 'xlsx':
+        temporal = tempfile.TemporaryFile()
+        escribir_xlsx(filas, temporal)
+        temporal.seek(0)
+        return FileResponse(temporal, as_attachment=True, filename=nombre_archivo,
+                            content_type=FORMATOS_EXPORTACION['xlsx'])
+
+    generador = generar_csv(filas) if formato == 'csv' else generar_jsonl(filas)
+    respuesta = StreamingHttpResponse(generador, content_type=FORMATOS_EXPORTACION[formato])
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+    return respuesta
+
+
+def formatos_disponibles():
+    return [formato for formato in FORMATOS_EXPORTACION if formato != 'xlsx' or Workbook is not None]
@@ -0,0 +1,138 @@
+import base64
+import io
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from PIL import Image as PilImage, ImageOps, UnidentifiedImageError
+
+try:
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+except ImportError:  # Sin pillow-heif no se aceptan fotos HEIC
+    pass
+
+
+# Que Pillow también rechace las bombas de descompresión fuera de procesar_imagen (admin, forms)
+PilImage.MAX_IMAGE_PIXELS = settings.IMAGEN_MAX_MEGAPIXELES * 1_000_000
+
+# Lado mayor de la miniatura borrosa (LQIP) que se muestra mientras carga la foto
+LQIP_LADO = 16
+
+
+def _limite_pixeles():
+    return settings.IMAGEN_MAX_MEGAPIXELES * 1_000_000
+
+
+def validar_imagen_subida(archivo):
+    """
+    Validador del campo imagen: rechaza archivos demasiado grandes o con demasiados píxeles
+    (bombas de descompresión) leyendo solo la cabecera, sin decodificar la imagen.
+    """
+    # Los archivos ya guardados no se vuelven a validar (editar la descripción no debe leerlos)
+    if not archivo or getattr(archivo, '_committed', False):
+        return
+    tamano = getattr(archivo, 'size', None)
+    if tamano and tamano > settings.IMAGEN_MAX_MB * 1024 * 1024:
+        raise ValidationError(
+            f"La imagen pesa {tamano / (1024 * 1024):.1f} MB; el máximo es {settings.IMAGEN_MAX_MB} MB."
+        )
+    try:
+        posicion = archivo.tell() if hasattr(archivo, 'tell') else None
+        with PilImage.open(archivo) as img:
+            ancho, alto = img.size
+    except (UnidentifiedImageError, OSError, PilImage.DecompressionBombError) as e:
+        raise ValidationError(f"No se pudo leer la imagen: {e}")
+    finally:
+        if hasattr(archivo, 'seek'):
+            archivo.seek(posicion or 0)
+    if ancho * alto > _limite_pixeles():
+        raise ValidationError(
+            f"La imagen mide {ancho}x{alto} ({ancho * alto / 1_000_000:.0f} MP); "
+            f"el máximo es {settings.IMAGEN_MAX_MEGAPIXELES} MP."
+        )
+
+
+def metadatos_imagen(img):
+    """
+    Datos para maquetar la foto antes de descargarla, a partir de la imagen ya decodificada:
+    ancho y alto, un LQIP (miniatura WebP de 16 px en data URI, unos cientos de bytes) y el
+    color dominante en hexadecimal. Trabaja sobre una muestra de 64 px, así que es barato.
+    """
+    ancho, alto = img.size
+    muestra = img.reduce(max(1, min(ancho, alto) // 128))
+    muestra.thumbnail((64, 64), PilImage.Resampling.BILINEAR)
+    if muestra.mode != 'RGB':
+        muestra = muestra.convert('RGB')
+
+    # El color más frecuente tras reducir la muestra a 5 colores (no el promedio, que se ve gris)
+    paleta = muestra.quantize(colors=5, method=PilImage.Quantize.MEDIANCUT)
+    _, indice = max(paleta.getcolors())
+    rojo, verde, azul = paleta.getpalette()[indice * 3:indice * 3 + 3]
+
+    miniatura = muestra.copy()
+    miniatura.thumbnail((LQIP_LADO, LQIP_LADO), PilImage.Resampling.BILINEAR)
+    buffer = io.BytesIO()
+    miniatura.save(buffer, format='WEBP', quality=40)
+    return {
+        'ancho': ancho,
+        'alto': alto,
+        'lqip': 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii'),
+        'color_dominante': f'#{rojo:02x}{verde:02x}{azul:02x}',
+    }
+
+
+def metadatos_archivo(archivo):
+    """metadatos_imagen() de una foto ya guardada (para completar las filas existentes)"""
+    try:
+        with PilImage.open(archivo) as img:
+            # El navegador aplica la orientación EXIF: las dimensiones deben ser las que muestra
+            ImageOps.exif_transpose(img, in_place=True)
+            return metadatos_imagen(img)
+    except (UnidentifiedImageError, OSError, ValueError, PilImage.DecompressionBombError) as e:
+        raise ValidationError(f"No se pudo leer la imagen: {e}")
+
+
+def procesar_imagen(archivo, target_width=1200, target_height=800, quality=85):
+    """Como procesar_imagen_con_metadatos(), devolviendo solo los bytes WebP"""
+    return procesar_imagen_con_metadatos(archivo, target_width, target_height, quality)[0]
+
+
+def procesar_imagen_con_metadatos(archivo, target_width=1200, target_height=800, quality=85):
+    """
+    Decodifica, orienta y reduce una imagen a WebP con memoria acotada.
+    - JPEG: draft() hace que el decodificador entregue la imagen ya reducida (1/2, 1/4, 1/8).
+    - Resto de formatos: thumbnail() con reducing_gap reduce por bloques (reduce()) antes del
+      remuestreo final, sin copias intermedias a tamaño completo.
+    - Se aplica la orientación EXIF antes de redimensionar.
+    - Los metadatos (metadatos_imagen) se calculan sobre la imagen ya reducida, sin otra decodificación.
+    Devuelve (bytes WebP, metadatos); lanza ValidationError si la imagen no es válida o excede los límites.
+    """
+    try:
+        img = PilImage.open(archivo)
+    except (UnidentifiedImageError, OSError, PilImage.DecompressionBombError) as e:
+        raise ValidationError(f"No se pudo leer la imagen: {e}")
+
+    with img:
+        ancho, alto = img.size
+        if ancho * alto > _limite_pixeles():
+            raise ValidationError(
+                f"La imagen mide {ancho}x{alto}; el máximo es {settings.IMAGEN_MAX_MEGAPIXELES} MP."
+            )
+
+        # Con la orientación EXIF el ancho y el alto pueden intercambiarse: pedir el lado mayor
+        lado = max(target_width, target_height)
+        img.draft('RGB', (lado, lado))
+
+        try:
+            # in_place evita la copia completa que exif_transpose hace cuando no hay rotación
+            ImageOps.exif_transpose(img, in_place=True)
+            if img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            img.thumbnail((target_width, target_height), PilImage.Resampling.LANCZOS, reducing_gap=2.0)
+
+            buffer = io.BytesIO()
+            img.save(buffer, format='WEBP', quality=quality)
+            metadatos = metadatos_imagen(img)
+        except (OSError, ValueError, PilImage.DecompressionBombError) as e:
+            raise ValidationError(f"No se pudo procesar la imagen: {e}")
+
+    return buffer.getvalue(), metadatos
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from webpage.models import Contacto
+from webpage.retencion import archivar_contactos, fecha_limite
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve a la tabla de archivo (ContactoArchivado) los contactos con más de "
+        "CONTACTOS_RETENCION_DIAS días, en transacciones por lotes. Pensado para ejecutarse "
+        "periódicamente (cron) y mantener pequeña la tabla de contactos del admin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=None,
+                            help=f"Antigüedad mínima en días (por defecto {settings.CONTACTOS_RETENCION_DIAS})")
+        parser.add_argument('--lote', type=int, default=None)
+        parser.add_argument('--simular', action='store_true', help="Solo cuenta los contactos que se archivarían")
+
+    def handle(self, *args, **options):
+        if options['simular']:
+            pendientes = Contacto.objects.filter(fecha_contacto__lt=fecha_limite(options['dias'])).count()
+            self.stdout.write(f"Se archivarían {pendientes} contactos.")
+            return
+        total = archivar_contactos(dias=options['dias'], lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f"Contactos archivados: {total}"))
@@ -0,0 +1,224 @@
+import json
+import os
+import posixpath
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models
+
+ESTADO_AUDITORIA = '.auditoria_media.json'
+
+
+def _escanear_directorio(raiz, relativo, previo):
+    """
+    Lista un directorio con os.scandir. Si su mtime no cambió desde la auditoría anterior
+    se reutiliza el listado guardado (las altas y bajas de archivos cambian el mtime del directorio).
+    Devuelve (relativo, entrada, reutilizado).
+    """
+    ruta = os.path.join(raiz, relativo)
+    try:
+        mtime = os.stat(ruta).st_mtime_ns
+    except FileNotFoundError:
+        return relativo, {'mtime': None, 'dirs': [], 'archivos': []}, False
+    if previo and previo['mtime'] == mtime:
+        return relativo, previo, True
+
+    dirs, archivos = [], []
+    with os.scandir(ruta) as entradas:
+        for entrada in entradas:
+            if entrada.name.startswith('.'):
+                continue
+            if entrada.is_dir(follow_symlinks=False):
+                dirs.append(entrada.name)
+            elif entrada.is_file(follow_symlinks=False):
+                stat = entrada.stat(follow_symlinks=False)
+                archivos.append([entrada.name, stat.st_size, stat.st_mtime])
+    return relativo, {'mtime': mtime, 'dirs': dirs, 'archivos': archivos}, False
+
+
+def recorrer_media(raiz, hilos, estado_previo):
+    """Recorre `raiz` en paralelo (un directorio por tarea); devuelve (estado, reutilizados)"""
+    estado, reutilizados = {}, 0
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        pendientes = {executor.submit(_escanear_directorio, raiz, '', estado_previo.get(''))}
+        while pendientes:
+            hechos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in hechos:
+                relativo, entrada, reutilizado = futuro.result()
+                estado[relativo] = entrada
+                reutilizados += reutilizado
+                for subdirectorio in entrada['dirs']:
+                    hijo = posixpath.join(relativo, subdirectorio) if relativo else subdirectorio
+                    pendientes.add(executor.submit(_escanear_directorio, raiz, hijo, estado_previo.get(hijo)))
+    return estado, reutilizados
+
+
+def campos_archivo():
+    """(modelo, nombre_campo) de todos los FileField/ImageField del proyecto"""
+    for modelo in apps.get_models():
+        for campo in modelo._meta.concrete_fields:
+            if isinstance(campo, models.FileField):
+                yield modelo, campo.name
+
+
+def rutas_referenciadas(chunk_size=2000):
+    """Genera las rutas de media guardadas en la base de datos sin cargar los modelos"""
+    for modelo, campo in campos_archivo():
+        consulta = (modelo._default_manager.exclude(**{f'{campo}__isnull': True})
+                    .exclude(**{campo: ''}).values_list(campo, flat=True))
+        yield from consulta.iterator(chunk_size=chunk_size)
+
+
+def filtrar_referenciadas(rutas):
+    """Subconjunto de `rutas` que alguna fila referencia (comprobación previa a borrar)"""
+    referenciadas = set()
+    for modelo, campo in campos_archivo():
+        referenciadas.update(
+            modelo._default_manager.filter(**{f'{campo}__in': rutas}).values_list(campo, flat=True)
+        )
+    return referenciadas
+
+
+def _lotes(elementos, tamano):
+    for inicio in range(0, len(elementos), tamano):
+        yield elementos[inicio:inicio + tamano]
+
+
+class Command(BaseCommand):
+    help = (
+        "Audita MEDIA_ROOT contra la base de datos: recorre el volumen en paralelo, informa de "
+        "archivos huérfanos (sin fila que los use) y de filas cuyo archivo falta. Opcionalmente "
+        "borra los huérfanos o copia los faltantes desde el media local (el respaldo de "
+        "MediaFilesMiddleware), por lotes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=8, help="Directorios escaneados en paralelo")
+        parser.add_argument('--incremental', action='store_true',
+                            help=f"Solo reescanea directorios cuyo mtime cambió desde la última auditoría "
+                                 f"(estado en MEDIA_ROOT/{ESTADO_AUDITORIA})")
+        parser.add_argument('--borrar-huerfanos', action='store_true',
+                            help="Borra los archivos que ninguna fila referencia")
+        parser.add_argument('--antiguedad-minima', type=int, default=60,
+                            help="Minutos: no borra huérfanos más recientes (subidas en curso)")
+        parser.add_argument('--migrar-faltantes', action='store_true',
+                            help="Copia al volumen los archivos faltantes que existan en BASE_DIR/media")
+        parser.add_argument('--lote', type=int, default=500)
+        parser.add_argument('--mostrar', type=int, default=20, help="Ejemplos a listar de cada tipo")
+
+    def handle(self, *args, **options):
+        raiz = settings.MEDIA_ROOT
+        if not os.path.isdir(raiz):
+            raise CommandError(f"MEDIA_ROOT no existe: {raiz}")
+        ruta_estado = os.path.join(raiz, ESTADO_AUDITORIA)
+        self._errores = 0
+
+        estado_previo = self._leer_estado(ruta_estado) if options['incremental'] else {}
+        inicio = time.perf_counter()
+        estado, reutilizados = recorrer_media(raiz, options['hilos'], estado_previo)
+        archivos = {
+            (posixpath.join(relativo, nombre) if relativo else nombre): (tamano, mtime)
+            for relativo, entrada in estado.items()
+            for nombre, tamano, mtime in entrada['archivos']
+        }
+        duracion_escaneo = time.perf_counter() - inicio
+        self._guardar_estado(ruta_estado, estado)
+
+        referenciadas = set(rutas_referenciadas())
+        huerfanos = sorted(set(archivos) - referenciadas)
+        faltantes = sorted(referenciadas - set(archivos))
+
+        self.stdout.write(
+            f"{len(archivos)} archivos en {len(estado)} directorios "
+            f"({reutilizados} sin cambios) escaneados en {duracion_escaneo:.2f} s; "
+            f"{len(referenciadas)} rutas en la base de datos."
+        )
+        bytes_huerfanos = sum(archivos[ruta][0] for ruta in huerfanos)
+        self._listar(f"Huérfanos: {len(huerfanos)} ({bytes_huerfanos / (1024 * 1024):.1f} MB)",
+                     huerfanos, options['mostrar'])
+        self._listar(f"Faltantes: {len(faltantes)}", faltantes, options['mostrar'])
+
+        if options['borrar_huerfanos'] and huerfanos:
+            self._borrar_huerfanos(raiz, huerfanos, archivos, options)
+        if options['migrar_faltantes'] and faltantes:
+            self._migrar_faltantes(raiz, faltantes, options['lote'])
+        if self._errores:
+            raise CommandError(f"La auditoría terminó con {self._errores} errores.")
+
+    def _error(self, mensaje):
+        self._errores += 1
+        self.stderr.write(self.style.ERROR(mensaje))
+
+    def _listar(self, titulo, rutas, maximo):
+        estilo = self.style.WARNING if rutas else self.style.SUCCESS
+        self.stdout.write(estilo(titulo))
+        for ruta in rutas[:maximo]:
+            self.stdout.write(f"  {ruta}")
+        if len(rutas) > maximo:
+            self.stdout.write(f"  ... y {len(rutas) - maximo} más")
+
+    def _borrar_huerfanos(self, raiz, huerfanos, archivos, options):
+        limite = time.time() - options['antiguedad_minima'] * 60
+        borrados = omitidos = 0
+        for lote in _lotes(huerfanos, options['lote']):
+            # Volver a consultar justo antes de borrar: una fila pudo crearse durante la auditoría
+            en_uso = filtrar_referenciadas(lote)
+            for ruta in lote:
+                if ruta in en_uso or archivos[ruta][1] > limite:
+                    omitidos += 1
+                    continue
+                ruta_absoluta = os.path.join(raiz, ruta)
+                try:
+                    # mtime actual, no el del escaneo: reutilizar una foto deduplicada lo renueva
+                    if os.stat(ruta_absoluta).st_mtime > limite:
+                        omitidos += 1
+                        continue
+                    os.remove(ruta_absoluta)
+                    borrados += 1
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    self._error(f"Error eliminando huérfano {ruta}: {e}")
+        self.stdout.write(self.style.SUCCESS(f"{borrados} huérfanos borrados, {omitidos} omitidos."))
+
+    def _migrar_faltantes(self, raiz, faltantes, tamano_lote):
+        origen = os.path.join(settings.BASE_DIR, 'media')
+        if os.path.realpath(origen) == os.path.realpath(raiz):
+            self.stdout.write(self.style.WARNING("MEDIA_ROOT es el media local: no hay de dónde migrar."))
+            return
+        copiados = sin_origen = 0
+        for lote in _lotes(faltantes, tamano_lote):
+            for ruta in lote:
+                ruta_origen = os.path.join(origen, ruta)
+                if not os.path.isfile(ruta_origen):
+                    sin_origen += 1
+                    continue
+                destino = os.path.join(raiz, ruta)
+                try:
+                    os.makedirs(os.path.dirname(destino), exist_ok=True)
+                    shutil.copy2(ruta_origen, destino)
+                    copiados += 1
+                except OSError as e:
+                    self._error(f"Error migrando {ruta}: {e}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{copiados} archivos migrados desde {origen}; {sin_origen} no existen en ningún sitio."
+        ))
+
+    def _leer_estado(self, ruta):
+        try:
+            with open(ruta, encoding='utf-8') as archivo:
+                return json.load(archivo)
+        except (OSError, ValueError):
+            return {}
+
+    def _guardar_estado(self, ruta, estado):
+        temporal = f'{ruta}.tmp'
+        try:
+            with open(temporal, 'w', encoding='utf-8') as archivo:
+                json.dump(estado, archivo, separators=(',', ':'))
+            os.replace(temporal, ruta)
+        except OSError as e:
+            self._error(f"Error guardando el estado de la auditoría en {ruta}: {e}")
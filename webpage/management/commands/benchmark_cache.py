@@ -0,0 +1,84 @@
+import multiprocessing
+import os
+import tempfile
+import time
+from django.core.management.base import BaseCommand
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'archivos': 'django.core.cache.backends.filebased.FileBasedCache',
+    'sqlite': 'webpage.cache.CacheSQLite',
+}
+
+
+def _crear(nombre, directorio):
+    from django.utils.module_loading import import_string
+
+    ubicacion = {
+        'locmem': 'benchmark',
+        'archivos': os.path.join(directorio, 'archivos'),
+        'sqlite': os.path.join(directorio, 'cache.sqlite3'),
+    }[nombre]
+    return import_string(BACKENDS[nombre])(ubicacion, {'OPTIONS': {'MAX_ENTRIES': 100000}})
+
+
+def _incrementar(nombre, directorio, veces):
+    """Se ejecuta en otro proceso, como un worker de gunicorn"""
+    import django
+    django.setup()
+    cache = _crear(nombre, directorio)
+    for _ in range(veces):
+        try:
+            cache.incr('version')
+        except ValueError:
+            cache.add('version', 0)
+            cache.incr('version')
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la caché compartida (webpage.cache.CacheSQLite) con LocMemCache y FileBasedCache: "
+        "microsegundos por get/set/incr y, con varios procesos incrementando el mismo contador, "
+        "cuántos incrementos llegan al valor final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operaciones', type=int, default=5000)
+        parser.add_argument('--procesos', type=int, default=4)
+        parser.add_argument('--tamano', type=int, default=4096, help="Bytes de cada valor")
+
+    def handle(self, *args, **options):
+        n, procesos = options['operaciones'], options['procesos']
+        valor = os.urandom(options['tamano'])
+        contexto = multiprocessing.get_context('spawn')
+
+        self.stdout.write(f"{'backend':<10}{'set':>10}{'get':>10}{'get miss':>10}{'incr':>10}"
+                          f"{'contador':>14}  (us/op; contador = final/esperado con {procesos} procesos)")
+        for nombre in BACKENDS:
+            with tempfile.TemporaryDirectory() as directorio:
+                cache = _crear(nombre, directorio)
+                tiempos = [
+                    self._medir(lambda i: cache.set(f'clave:{i % 1000}', valor), n),
+                    self._medir(lambda i: cache.get(f'clave:{i % 1000}'), n),
+                    self._medir(lambda i: cache.get(f'falta:{i}'), n),
+                ]
+                cache.set('contador', 0)
+                tiempos.append(self._medir(lambda i: cache.incr('contador'), n))
+
+                por_proceso = max(n // procesos, 1)
+                cache.set('version', 0, timeout=None)
+                with contexto.Pool(procesos) as pool:
+                    pool.starmap(_incrementar, [(nombre, directorio, por_proceso)] * procesos)
+                final = cache.get('version')
+                self.stdout.write(
+                    f"{nombre:<10}" + ''.join(f"{t:>10.1f}" for t in tiempos)
+                    + f"{f'{final}/{por_proceso * procesos}':>14}"
+                )
+        self.stdout.write("LocMemCache no se comparte entre procesos; FileBasedCache pierde incrementos "
+                          "concurrentes porque incr() es get() + set().")
+
+    def _medir(self, operacion, n):
+        inicio = time.perf_counter()
+        for i in range(n):
+            operacion(i)
+        return (time.perf_counter() - inicio) / n * 1e6
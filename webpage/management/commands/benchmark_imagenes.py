@@ -0,0 +1,100 @@
+import io
+import multiprocessing
+import os
+import tempfile
+import time
+from django.core.management.base import BaseCommand
+from PIL import Image as PilImage
+
+
+def _procesar_ingenuo(archivo):
+    """Procesamiento anterior: decodificación completa, sin draft ni orientación EXIF"""
+    img = PilImage.open(archivo)
+    if img.mode in ('RGBA', 'P', 'CMYK', 'LAB'):
+        img = img.convert('RGB')
+    img.load()
+    img.thumbnail((1200, 800), PilImage.Resampling.LANCZOS)
+    img.save(io.BytesIO(), format='WEBP', quality=85)
+
+
+def _rss_kb(campo):
+    """Lee VmRSS/VmHWM de /proc; a diferencia de ru_maxrss no hereda el pico del proceso padre"""
+    with open('/proc/self/status') as status:
+        for linea in status:
+            if linea.startswith(campo + ':'):
+                return int(linea.split()[1])
+    return 0
+
+
+def _medir(ruta, modo):
+    """Se ejecuta en un proceso nuevo para que el pico de RSS sea solo el de esta imagen"""
+    import django
+    django.setup()
+    from webpage.imagenes import procesar_imagen
+
+    # Reiniciar el pico (VmHWM) para medir solo el procesamiento
+    with open('/proc/self/clear_refs', 'w') as clear_refs:
+        clear_refs.write('5')
+    base = _rss_kb('VmRSS')
+    inicio = time.perf_counter()
+    with open(ruta, 'rb') as archivo:
+        if modo == 'acotado':
+            procesar_imagen(archivo)
+        else:
+            _procesar_ingenuo(archivo)
+    duracion = time.perf_counter() - inicio
+    return duracion, (_rss_kb('VmHWM') - base) / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el pico de memoria (RSS) y el tiempo por imagen de FotosSubcategoria._process_image "
+        "con entradas de 12 MP y 48 MP en JPEG, PNG y HEIC, comparado con la decodificación completa. "
+        "Requiere Linux (/proc) para medir el pico de RSS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=1)
+
+    def handle(self, *args, **options):
+        formatos = ['JPEG', 'PNG']
+        try:
+            import pillow_heif
+            pillow_heif.register_heif_opener()
+            formatos.append('HEIF')
+        except ImportError:
+            self.stdout.write(self.style.WARNING("pillow-heif no está instalado: se omite HEIC."))
+
+        tamanos = {'12MP': (4000, 3000), '48MP': (8000, 6000)}
+        contexto = multiprocessing.get_context('spawn')
+
+        with tempfile.TemporaryDirectory() as directorio:
+            self.stdout.write(f"{'entrada':<14}{'modo':<10}{'tiempo (s)':>12}{'pico RSS (MB)':>16}")
+            for etiqueta, tamano in tamanos.items():
+                base = self._imagen_sintetica(tamano)
+                for formato in formatos:
+                    ruta = os.path.join(directorio, f'{etiqueta}.{formato.lower()}')
+                    parametros = {} if formato == 'PNG' else {'quality': 90}
+                    base.save(ruta, format=formato, **parametros)
+                    for modo in ('completo', 'acotado'):
+                        tiempos, picos = [], []
+                        try:
+                            for _ in range(options['repeticiones']):
+                                with contexto.Pool(1) as pool:
+                                    duracion, pico = pool.apply(_medir, (ruta, modo))
+                                tiempos.append(duracion)
+                                picos.append(pico)
+                        except Exception as e:
+                            self.stdout.write(f"{etiqueta + ' ' + formato:<14}{modo:<10}  error: {e}")
+                            continue
+                        self.stdout.write(
+                            f"{etiqueta + ' ' + formato:<14}{modo:<10}"
+                            f"{min(tiempos):>12.3f}{max(picos):>16.1f}"
+                        )
+                base.close()
+
+    def _imagen_sintetica(self, tamano):
+        """Degradado con algo de ruido: comprime como una foto sin tardar en generarse"""
+        gradiente = PilImage.linear_gradient('L').resize(tamano)
+        ruido = PilImage.effect_noise(tamano, 40)
+        return PilImage.merge('RGB', (gradiente, ruido, gradiente.transpose(PilImage.Transpose.FLIP_LEFT_RIGHT)))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from webpage.procesamiento import completar_metadatos
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcula ancho, alto, LQIP y color dominante de las fotos existentes que aún no los tienen "
+        "(las nuevas los obtienen al procesarse). Con --todas los recalcula para todas las fotos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true', help="Recalcular también las que ya los tienen")
+        parser.add_argument('--lote', type=int, default=100, help="Archivos por lote")
+
+    def handle(self, *args, **options):
+        completadas, fallidas = completar_metadatos(lote=options['lote'], todas=options['todas'])
+        estilo = self.style.WARNING if fallidas else self.style.SUCCESS
+        self.stdout.write(estilo(f"{completadas} imágenes completadas, {fallidas} con error."))
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand
+from webpage.cdn import CLAVE_CATALOGO, clave_subcategoria, purgar
+from webpage.models import FotosSubcategoria, Subcategoria
+from webpage.signals import eliminar_imagen_sin_referencias, incrementar_version_categoria
+
+
+class Command(BaseCommand):
+    help = (
+        "Migra las fotos existentes al storage direccionado por contenido: renombra cada archivo "
+        "con el hash de sus bytes, apunta todas las filas con el mismo contenido al mismo archivo "
+        "y borra los duplicados que quedan sin referencias."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Solo informa lo que haría, sin mover ni borrar archivos")
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        storage = FotosSubcategoria._meta.get_field('imagen').storage
+        migradas = faltantes = liberados = 0
+        bytes_liberados = 0
+        destinos = {}
+        subcategorias = set()
+
+        fotos = FotosSubcategoria.objects.exclude(imagen='').values_list('pk', 'imagen', 'subcategoria_id').order_by('pk')
+        for pk, nombre, subcategoria_id in fotos.iterator(chunk_size=500):
+            if not storage.exists(nombre):
+                faltantes += 1
+                self.stdout.write(self.style.WARNING(f"Foto {pk}: no existe {nombre}"))
+                continue
+
+            if nombre not in destinos:
+                with storage.open(nombre) as archivo:
+                    destino = storage.nombre_para(archivo, nombre)
+                    if destino != nombre and not dry_run:
+                        destino = storage.save(destino, archivo)
+                destinos[nombre] = (destino, storage.size(nombre))
+
+            destino, tamano = destinos[nombre]
+            if destino == nombre:
+                continue
+            migradas += 1
+            if not dry_run:
+                # update() evita reprocesar la imagen en save() y las señales de versión
+                FotosSubcategoria.objects.filter(pk=pk).update(imagen=destino)
+                subcategorias.add(subcategoria_id)
+
+        # Sin señales: invalidar aquí los fragmentos cacheados y la CDN, que aún apuntan a los
+        # archivos originales, antes de borrarlos (una vez por categoría y subcategoría)
+        categorias = set(Subcategoria.objects.filter(pk__in=subcategorias).values_list('categoria_id', flat=True))
+        for categoria_id in categorias:
+            incrementar_version_categoria(categoria_id)
+        if subcategorias:
+            purgar(CLAVE_CATALOGO, *map(clave_subcategoria, subcategorias))
+
+        # Los archivos originales se borran cuando ya ninguna fila los usa
+        for nombre, (destino, tamano) in destinos.items():
+            if destino == nombre:
+                continue
+            liberados += 1
+            bytes_liberados += tamano
+            if not dry_run:
+                eliminar_imagen_sin_referencias(nombre)
+
+        unicos = len({destino for destino, _ in destinos.values()})
+        prefijo = "[dry-run] " if dry_run else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefijo}{migradas} filas migradas, {len(destinos)} archivos -> {unicos} únicos, "
+            f"{liberados} archivos liberados ({bytes_liberados / (1024 * 1024):.1f} MB), "
+            f"{faltantes} archivos faltantes."
+        ))
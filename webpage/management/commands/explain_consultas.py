@@ -0,0 +1,131 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from datetime import timedelta
+from webpage.models import Categoria, Subcategoria, FotosSubcategoria, Contacto
+
+
+class Command(BaseCommand):
+    help = (
+        "Carga un conjunto de datos de prueba dentro de una transacción, ejecuta EXPLAIN "
+        "sobre las consultas más frecuentes y reporta si el planificador usa los índices. "
+        "La transacción se revierte al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categorias', type=int, default=20)
+        parser.add_argument('--subcategorias', type=int, default=25, help='Subcategorías por categoría')
+        parser.add_argument('--fotos', type=int, default=20, help='Fotos por subcategoría')
+        parser.add_argument('--contactos', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._sembrar_datos(options)
+            self._analizar_tablas()
+
+            subcategoria = Subcategoria.objects.order_by('id').first()
+            consultas = [
+                (
+                    'Foto destacada de una subcategoría',
+                    FotosSubcategoria.objects.filter(subcategoria=subcategoria).order_by('orden', 'fecha_subida')[:1],
+                    'fotos_subcat_orden_idx',
+                ),
+                (
+                    'Categoría por nombre (iexact)',
+                    Categoria.objects.filter(nombre__iexact='HOGAR'),
+                    'categoria_nombre_upper_idx',
+                ),
+                (
+                    'Listado de contactos del admin',
+                    Contacto.objects.order_by('-fecha_contacto')[:100],
+                    'contacto_fecha_idx',
+                ),
+                (
+                    'Contactos filtrados por email_enviado',
+                    Contacto.objects.filter(email_enviado=False).order_by('-fecha_contacto')[:100],
+                    'contacto_enviado_fecha_idx',
+                ),
+                (
+                    'Contactos filtrados por categoría',
+                    Contacto.objects.filter(categoria='cocinas').order_by('-fecha_contacto')[:100],
+                    'contacto_categoria_fecha_idx',
+                ),
+            ]
+
+            usados = 0
+            for titulo, queryset, indice in consultas:
+                plan = queryset.explain()
+                usa_indice = indice in plan
+                usados += usa_indice
+                estado = self.style.SUCCESS('USA ÍNDICE') if usa_indice else self.style.WARNING('SIN ÍNDICE')
+                self.stdout.write(f"\n[{estado}] {titulo} ({indice})")
+                for linea in plan.splitlines():
+                    self.stdout.write(f"    {linea}")
+
+            self.stdout.write(f"\n{usados}/{len(consultas)} consultas usan el índice esperado ({connection.vendor}).")
+            if connection.vendor == 'sqlite':
+                self.stdout.write(
+                    "Nota: en SQLite iexact se traduce a LIKE, por lo que el índice UPPER(nombre) "
+                    "solo aplica en PostgreSQL."
+                )
+
+            # No dejar los datos de prueba en la base de datos
+            transaction.set_rollback(True)
+
+    def _sembrar_datos(self, options):
+        """Crea categorías, subcategorías, fotos y contactos con bulk_create"""
+        ahora = timezone.now()
+
+        categorias = Categoria.objects.bulk_create([
+            Categoria(nombre=nombre)
+            for nombre in ['HOGAR', 'EMPRESA'] + [f'Categoria {i}' for i in range(options['categorias'])]
+        ])
+
+        subcategorias = Subcategoria.objects.bulk_create([
+            Subcategoria(categoria=categoria, nombre=f'{categoria.nombre} {i}')
+            for categoria in categorias
+            for i in range(options['subcategorias'])
+        ])
+
+        FotosSubcategoria.objects.bulk_create([
+            FotosSubcategoria(
+                subcategoria=subcategoria,
+                imagen=f'explain/{subcategoria.id}-{i}.webp',
+                descripcion=subcategoria.nombre,
+                orden=i,
+            )
+            for subcategoria in subcategorias
+            for i in range(options['fotos'])
+        ], batch_size=1000)
+
+        categorias_contacto = ['cocinas', 'banos', 'dormitorios', 'oficinas', 'sillas', '']
+        contactos = Contacto.objects.bulk_create([
+            Contacto(
+                nombre=f'Contacto {i}',
+                email=f'contacto{i}@example.com',
+                telefono=f'300{i:07d}',
+                categoria=categorias_contacto[i % len(categorias_contacto)],
+                mensaje='Mensaje de prueba',
+                email_enviado=i % 10 != 0,
+            )
+            for i in range(options['contactos'])
+        ], batch_size=1000)
+
+        # auto_now_add asigna la misma fecha a todo el lote; repartirla en el tiempo
+        for i, contacto in enumerate(contactos):
+            contacto.fecha_contacto = ahora - timedelta(minutes=i)
+        Contacto.objects.bulk_update(contactos, ['fecha_contacto'], batch_size=1000)
+
+        self.stdout.write(
+            f"Datos sembrados: {len(categorias)} categorías, {len(subcategorias)} subcategorías, "
+            f"{len(subcategorias) * options['fotos']} fotos, {len(contactos)} contactos."
+        )
+
+    def _analizar_tablas(self):
+        """Actualiza las estadísticas del planificador tras la carga"""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                for model in (Categoria, Subcategoria, FotosSubcategoria, Contacto):
+                    cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+            elif connection.vendor == 'sqlite':
+                cursor.execute('ANALYZE')
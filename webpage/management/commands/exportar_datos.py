@@ -0,0 +1,61 @@
+import logging
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from webpage.exportacion import escribir_exportacion, filtrar_por_fechas, formatos_disponibles
+from webpage.resources import ContactoArchivadoResource, ContactoResource, FotosSubcategoriaResource
+
+EXPORTACIONES = {
+    'contactos': (ContactoResource, 'fecha_contacto'),
+    'contactos-archivados': (ContactoArchivadoResource, 'fecha_contacto'),
+    'catalogo': (FotosSubcategoriaResource, 'fecha_subida'),
+}
+
+
+def _fecha(valor):
+    fecha = parse_date(valor)
+    if fecha is None:
+        raise CommandError(f"Fecha inválida (use AAAA-MM-DD): {valor}")
+    return fecha
+
+
+def _registro_en_stdout():
+    """True si algún handler de logging escribe en stdout: sus líneas se mezclarían con los datos"""
+    loggers = [logging.getLogger()] + [
+        registro for registro in logging.Logger.manager.loggerDict.values() if isinstance(registro, logging.Logger)
+    ]
+    return any(
+        getattr(handler, 'stream', None) in (sys.stdout, sys.__stdout__)
+        for registro in loggers for handler in registro.handlers
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta contactos o el catálogo a CSV, XLSX o JSONL leyendo la base de datos por bloques, "
+        "con memoria constante sin importar el número de filas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('datos', choices=sorted(EXPORTACIONES))
+        parser.add_argument('--formato', choices=formatos_disponibles(), default='csv')
+        parser.add_argument('--desde', type=_fecha, help="Fecha inicial incluida (AAAA-MM-DD)")
+        parser.add_argument('--hasta', type=_fecha, help="Fecha final incluida (AAAA-MM-DD)")
+        parser.add_argument('--salida', help="Archivo de destino (por defecto la salida estándar)")
+        parser.add_argument('--chunk-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        resource_class, campo_fecha = EXPORTACIONES[options['datos']]
+        resource = resource_class()
+        queryset = filtrar_por_fechas(resource.get_queryset(), campo_fecha, options['desde'], options['hasta'])
+
+        if options['salida']:
+            with open(options['salida'], 'wb') as destino:
+                escribir_exportacion(resource, queryset, options['formato'], destino, options['chunk_size'])
+            self.stderr.write(self.style.SUCCESS(f"Exportación escrita en {options['salida']}"))
+        elif options['formato'] == 'xlsx':
+            raise CommandError("La exportación XLSX requiere --salida.")
+        elif _registro_en_stdout():
+            raise CommandError("El logging escribe en la salida estándar y corrompería la exportación: use --salida.")
+        else:
+            escribir_exportacion(resource, queryset, options['formato'], sys.stdout.buffer, options['chunk_size'])
@@ -0,0 +1,110 @@
+import html
+import re
+import time
+import tablib
+from django.core.management.base import BaseCommand, CommandError
+from webpage.procesamiento import completar_metadatos, procesar_fotos_pendientes
+from webpage.resources import FotosSubcategoriaResource
+
+FORMATOS = ('csv', 'xlsx', 'json')
+
+
+def _diff_texto(fragmento):
+    """Convierte el HTML de diff-match-patch al formato de git --word-diff: [-borrado-]{+añadido+}"""
+    fragmento = re.sub(r'<del[^>]*>', '[-', fragmento).replace('</del>', '-]')
+    fragmento = re.sub(r'<ins[^>]*>', '{+', fragmento).replace('</ins>', '+}')
+    fragmento = fragmento.replace('&para;<br>', '\\n')
+    return html.unescape(re.sub(r'<[^>]+>', '', fragmento))
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa el catálogo (categoría, subcategoría, descripción, orden e imagen por fila) desde "
+        "CSV, XLSX o JSON. Sin --confirmar solo valida el archivo completo y muestra el diff; con "
+        "--confirmar escribe todo en una transacción con bulk_create/bulk_update y luego procesa "
+        "las imágenes nuevas. Las rutas de imagen son relativas a MEDIA_ROOT."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo')
+        parser.add_argument('--formato', choices=FORMATOS,
+                            help="Por defecto se deduce de la extensión del archivo")
+        parser.add_argument('--confirmar', action='store_true', help="Escribir los cambios")
+        parser.add_argument('--sin-procesar', action='store_true',
+                            help="No procesar las imágenes al terminar (quedan pendientes)")
+        parser.add_argument('--mostrar', type=int, default=20, help="Filas del diff a mostrar")
+
+    def handle(self, *args, **options):
+        formato = options['formato'] or options['archivo'].rsplit('.', 1)[-1].lower()
+        if formato not in FORMATOS:
+            raise CommandError(f"Formato no soportado: {formato}")
+        modo = 'rb' if formato == 'xlsx' else 'r'
+        with open(options['archivo'], modo, **({} if modo == 'rb' else {'encoding': 'utf-8-sig'})) as archivo:
+            dataset = tablib.Dataset().load(archivo.read(), format=formato)
+
+        # Validación completa y diff en seco (la transacción se revierte)
+        inicio = time.perf_counter()
+        resultado = self._importar(dataset, dry_run=True)
+        duracion = time.perf_counter() - inicio
+        self._informar(resultado, options['mostrar'])
+        self.stdout.write(f"Validación: {len(dataset)} filas en {duracion:.2f} s "
+                          f"({len(dataset) / max(duracion, 1e-9):.0f} filas/s)")
+        if resultado.has_errors() or resultado.has_validation_errors():
+            raise CommandError("El archivo tiene errores: no se importó nada.")
+        if not options['confirmar']:
+            self.stdout.write(self.style.WARNING("Ejecución en seco: use --confirmar para escribir los cambios."))
+            return
+
+        inicio = time.perf_counter()
+        resultado = self._importar(dataset, dry_run=False)
+        duracion = time.perf_counter() - inicio
+        if resultado.has_errors() or resultado.has_validation_errors():
+            self._informar(resultado, options['mostrar'])
+            raise CommandError("La importación falló y se revirtió.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Importadas {len(dataset)} filas en {duracion:.2f} s ({len(dataset) / max(duracion, 1e-9):.0f} filas/s)"
+        ))
+
+        if not options['sin_procesar']:
+            inicio = time.perf_counter()
+            procesadas, fallidas = procesar_fotos_pendientes()
+            # Las filas con archivos ya procesados (direccionados por contenido) solo necesitan metadatos
+            completadas, _ = completar_metadatos()
+            self.stdout.write(f"Imágenes procesadas: {procesadas} ({fallidas} con error), metadatos "
+                              f"completados: {completadas}, en {time.perf_counter() - inicio:.2f} s")
+
+    def _importar(self, dataset, dry_run):
+        resource = FotosSubcategoriaResource()
+        resultado = resource.import_data(
+            dataset, dry_run=dry_run, use_transactions=True, rollback_on_validation_errors=True,
+            encolar_imagenes=False,
+        )
+        resultado.categorias_creadas = getattr(resource, 'categorias_creadas', 0)
+        resultado.subcategorias_creadas = getattr(resource, 'subcategorias_creadas', 0)
+        return resultado
+
+    def _informar(self, resultado, maximo):
+        totales = ', '.join(f"{tipo}: {cantidad}" for tipo, cantidad in resultado.totals.items() if cantidad)
+        self.stdout.write(f"Filas -> {totales or 'ninguna'}; categorías nuevas: {resultado.categorias_creadas}, "
+                          f"subcategorías nuevas: {resultado.subcategorias_creadas}")
+
+        for error in resultado.base_errors:
+            self.stdout.write(self.style.ERROR(f"Error: {error.error}"))
+        for numero, errores in resultado.row_errors():
+            for error in errores:
+                self.stdout.write(self.style.ERROR(f"Fila {numero}: {type(error.error).__name__}: {error.error}"))
+        for fila in resultado.invalid_rows:
+            for campo, mensajes in fila.error_dict.items():
+                self.stdout.write(self.style.ERROR(f"Fila {fila.number}: {campo}: {' '.join(mensajes)}"))
+
+        mostradas = 0
+        for fila in resultado.rows:
+            if fila.import_type not in ('new', 'update') or not fila.diff or mostradas >= maximo:
+                continue
+            cambios = [
+                f"{cabecera}={_diff_texto(valor)}"
+                for cabecera, valor in zip(resultado.diff_headers, fila.diff)
+                if fila.import_type == 'new' or '<ins' in valor or '<del' in valor
+            ]
+            self.stdout.write(f"  {fila.import_type:<7}{'; '.join(cambios)}")
+            mostradas += 1
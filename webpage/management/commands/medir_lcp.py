@@ -0,0 +1,92 @@
+import statistics
+from django.core.management.base import BaseCommand, CommandError
+
+try:
+    from playwright.sync_api import sync_playwright
+except ImportError:  # Herramienta de desarrollo: pip install playwright && playwright install chromium
+    sync_playwright = None
+
+# LCP, FCP y TTFB de la carga; el LCP se da por cerrado cuando la página lleva un rato quieta
+_METRICAS_JS = """(espera) => new Promise(resolve => {
+    let lcp = 0;
+    new PerformanceObserver(lista => {
+        for (const entrada of lista.getEntries()) lcp = entrada.startTime;
+    }).observe({type: 'largest-contentful-paint', buffered: true});
+    setTimeout(() => {
+        const navegacion = performance.getEntriesByType('navigation')[0];
+        const fcp = performance.getEntriesByName('first-contentful-paint')[0];
+        resolve({
+            lcp: lcp,
+            fcp: fcp ? fcp.startTime : 0,
+            ttfb: navegacion ? navegacion.responseStart : 0,
+        });
+    }, espera);
+})"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el LCP de la home en Chromium headless (Playwright) con y sin la precarga de "
+        "webpage.precarga, alternando las cargas con caché vacía y red/CPU limitadas. "
+        "Ejecutar contra el servidor local con DEBUG=True (la cabecera X-Sin-Precarga solo "
+        "se respeta en desarrollo)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/')
+        parser.add_argument('--veces', type=int, default=5, help="Cargas de cada variante")
+        parser.add_argument('--latencia', type=int, default=150, help="Latencia añadida (ms)")
+        parser.add_argument('--bajada', type=int, default=1600, help="Ancho de banda de bajada (kbit/s)")
+        parser.add_argument('--cpu', type=float, default=4, help="Factor de ralentización de la CPU")
+        parser.add_argument('--espera', type=int, default=2000, help="Ms de espera tras la carga para cerrar el LCP")
+
+    def handle(self, *args, **options):
+        if sync_playwright is None:
+            raise CommandError("Requiere Playwright: pip install playwright && playwright install chromium")
+
+        resultados = {'con precarga': [], 'sin precarga': []}
+        with sync_playwright() as playwright:
+            navegador = playwright.chromium.launch()
+            try:
+                # Alternar las variantes reparte entre ambas las variaciones del servidor local
+                for _ in range(options['veces']):
+                    for variante, cabeceras in (('sin precarga', {'X-Sin-Precarga': '1'}), ('con precarga', {})):
+                        resultados[variante].append(self._cargar(navegador, cabeceras, options))
+            finally:
+                navegador.close()
+
+        self.stdout.write(f"{'variante':<14}{'LCP p50':>10}{'LCP p75':>10}{'FCP p50':>10}{'TTFB p50':>10}  (ms)")
+        for variante, cargas in resultados.items():
+            lcp = [carga['lcp'] for carga in cargas]
+            self.stdout.write(
+                f"{variante:<14}{statistics.median(lcp):>10.0f}{_percentil(lcp, 0.75):>10.0f}"
+                f"{statistics.median(c['fcp'] for c in cargas):>10.0f}"
+                f"{statistics.median(c['ttfb'] for c in cargas):>10.0f}"
+            )
+        ganancia = (statistics.median(c['lcp'] for c in resultados['sin precarga'])
+                    - statistics.median(c['lcp'] for c in resultados['con precarga']))
+        self.stdout.write(f"Ganancia de LCP (mediana): {ganancia:.0f} ms")
+
+    def _cargar(self, navegador, cabeceras, options):
+        # Contexto nuevo en cada carga: caché y service worker vacíos, como una primera visita
+        contexto = navegador.new_context(extra_http_headers=cabeceras, service_workers='block')
+        try:
+            pagina = contexto.new_page()
+            cdp = contexto.new_cdp_session(pagina)
+            cdp.send('Network.enable')
+            cdp.send('Network.emulateNetworkConditions', {
+                'offline': False,
+                'latency': options['latencia'],
+                'downloadThroughput': options['bajada'] * 1000 / 8,
+                'uploadThroughput': options['bajada'] * 1000 / 8 / 2,
+            })
+            cdp.send('Emulation.setCPUThrottlingRate', {'rate': options['cpu']})
+            pagina.goto(options['url'], wait_until='load', timeout=120000)
+            return pagina.evaluate(_METRICAS_JS, options['espera'])
+        finally:
+            contexto.close()
+
+
+def _percentil(valores, fraccion):
+    ordenados = sorted(valores)
+    return ordenados[min(int(len(ordenados) * fraccion), len(ordenados) - 1)]
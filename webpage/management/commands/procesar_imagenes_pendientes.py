@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from webpage.procesamiento import procesar_fotos_pendientes
+
+
+class Command(BaseCommand):
+    help = (
+        "Convierte a WebP las fotos importadas que siguen pendientes (por ejemplo si el worker "
+        "se reinició antes de terminar la cola)."
+    )
+
+    def handle(self, *args, **options):
+        procesadas, fallidas = procesar_fotos_pendientes()
+        estilo = self.style.WARNING if fallidas else self.style.SUCCESS
+        self.stdout.write(estilo(f"{procesadas} imágenes procesadas, {fallidas} con error."))
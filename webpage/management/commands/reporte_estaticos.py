@@ -0,0 +1,74 @@
+import gzip
+import re
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from webpage.storage import minificar_css, minificar_js
+from webpage.templatetags.static_extras import obtener_css_critico
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el efecto del pipeline de estáticos: bytes de CSS/JS antes y después de minificar "
+        "y comprimir, tamaño del CSS crítico y recursos que bloquean el renderizado en home.html."
+    )
+
+    archivos = ['css/home.css', 'js/home.js']
+
+    def handle(self, *args, **options):
+        self.stdout.write("Bytes por archivo (original -> minificado -> gzip / brotli):")
+        for ruta in self.archivos:
+            origen = finders.find(ruta)
+            if not origen:
+                self.stdout.write(self.style.WARNING(f"  {ruta}: no encontrado"))
+                continue
+            with open(origen, encoding='utf-8') as archivo:
+                original = archivo.read()
+            minificado = minificar_css(original) if ruta.endswith('.css') else minificar_js(original)
+            datos = minificado.encode('utf-8')
+            comprimido_br = len(brotli.compress(datos)) if brotli is not None else '-'
+            self.stdout.write(
+                f"  {ruta}: {len(original.encode('utf-8'))} -> {len(datos)} -> "
+                f"{len(gzip.compress(datos))} / {comprimido_br}"
+            )
+
+        for ruta in settings.CSS_CRITICO:
+            critico = obtener_css_critico(ruta)
+            self.stdout.write(f"CSS crítico en línea para {ruta}: {len(critico.encode('utf-8'))} bytes")
+
+        self.stdout.write("\nRecursos que bloquean el renderizado en home.html:")
+        antes = self._bloqueantes(False)
+        despues = self._bloqueantes(True)
+        self.stdout.write(f"  Sin CSS crítico: {len(antes)}")
+        for url in antes:
+            self.stdout.write(f"    {url}")
+        self.stdout.write(f"  Con CSS crítico: {len(despues)}")
+        for url in despues:
+            self.stdout.write(f"    {url}")
+
+    def _bloqueantes(self, css_critico):
+        """Hojas de estilo y scripts síncronos dentro del <head> de la página principal"""
+        host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost'
+        with override_settings(CSS_CRITICO_ACTIVO=css_critico):
+            response = Client(HTTP_HOST=host).get('/', HTTP_ACCEPT_ENCODING='identity')
+        html = response.content.decode('utf-8')
+        head = html.split('</head>')[0]
+        # Las etiquetas dentro de <noscript> solo aplican sin JavaScript
+        head = re.sub(r'<noscript>.*?</noscript>', '', head, flags=re.S)
+
+        bloqueantes = [
+            re.search(r'href="([^"]+)"', etiqueta).group(1)
+            for etiqueta in re.findall(r'<link[^>]*>', head)
+            if 'rel="stylesheet"' in etiqueta and 'href="' in etiqueta
+        ]
+        bloqueantes += [
+            src for etiqueta, src in re.findall(r'(<script[^>]*src="([^"]+)"[^>]*>)', head)
+            if ' defer' not in etiqueta and ' async' not in etiqueta
+        ]
+        return bloqueantes
@@ -1,7 +1,11 @@
+import hashlib
 import os
 from django.conf import settings
-from django.http import Http404
+from django.core.cache import cache
+from django.http import FileResponse, Http404
+from django.utils.cache import patch_vary_headers
 from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence, compress_string
 from django.views.static import serve
 
 
@@ -31,3 +35,115 @@ class MediaFilesMiddleware(MiddlewareMixin):
                 raise Http404("Media file not found")
 
         return None
+
+
+try:
+    import brotli
+except ImportError:  # Brotli es opcional; sin él se usa solo gzip
+    brotli = None
+
+
+class CompresionDinamicaMiddleware(MiddlewareMixin):
+    """
+    Comprime con Brotli o gzip las respuestas dinámicas (HTML, JSON, XML).
+    Las respuestas cacheables (Cache-Control con max-age o ETag) se comprimen una sola vez:
+    los bytes comprimidos se guardan en caché indexados por el hash del contenido, así las
+    respuestas repetidas (páginas y API cacheadas, sitemap) se sirven sin volver a comprimir.
+    Las páginas con token CSRF se comprimen siempre en gzip con relleno aleatorio
+    (mitigación BREACH de Django) y nunca se cachean.
+    """
+
+    TIPOS_COMPRIMIBLES = (
+        'text/html', 'text/plain', 'text/xml', 'text/csv',
+        'application/json', 'application/xml', 'application/javascript',
+    )
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or isinstance(response, FileResponse):
+            return response
+        tipo = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if tipo not in self.TIPOS_COMPRIMIBLES:
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESION_MIN_BYTES:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        # El token se usó si la cookie quedó pendiente (middleware) o ya se añadió (csrf_protect)
+        sensible = bool(
+            request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+            or settings.CSRF_COOKIE_NAME in response.cookies
+        )
+        # Los cuerpos en streaming y las páginas con token solo se comprimen en gzip: si el
+        # cliente no lo acepta (p. ej. solo br) se envían sin comprimir
+        codificacion = self._elegir_codificacion(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''), solo_gzip=response.streaming or sensible
+        )
+        if codificacion is None:
+            return response
+
+        if response.streaming:
+            # No se conoce el contenido completo: gzip al vuelo, sin caché
+            response.streaming_content = compress_sequence(
+                response.streaming_content, max_random_bytes=100 if sensible else 0
+            )
+            response.headers.pop('Content-Length', None)
+        elif sensible:
+            response.content = compress_string(response.content, max_random_bytes=100)
+        elif self._es_cacheable(response):
+            response.content = self._comprimir_cacheado(response.content, codificacion)
+        else:
+            response.content = self._comprimir(response.content, codificacion)
+
+        if not response.streaming:
+            response.headers['Content-Length'] = str(len(response.content))
+
+        # El ETag de la respuesta sin comprimir deja de ser fuerte
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = codificacion
+        return response
+
+    def _elegir_codificacion(self, accept_encoding, solo_gzip=False):
+        """Devuelve 'br', 'gzip' o None según Accept-Encoding y sus valores q (con solo_gzip, 'gzip' o None)"""
+        aceptadas = {}
+        for parte in accept_encoding.split(','):
+            nombre, _, parametros = parte.strip().partition(';')
+            calidad = 1.0
+            parametros = parametros.strip()
+            if parametros.startswith('q='):
+                try:
+                    calidad = float(parametros[2:])
+                except ValueError:
+                    calidad = 0.0
+            if nombre:
+                aceptadas[nombre.lower()] = calidad
+
+        if not solo_gzip and brotli is not None and aceptadas.get('br', 0) > 0:
+            return 'br'
+        if aceptadas.get('gzip', aceptadas.get('*', 0)) > 0:
+            return 'gzip'
+        return None
+
+    def _es_cacheable(self, response):
+        """Solo las respuestas que se declaran cacheables se repiten lo suficiente para guardarlas"""
+        if len(response.content) > settings.COMPRESION_CACHE_MAX_BYTES:
+            return False
+        cache_control = response.get('Cache-Control', '').lower()
+        if any(directiva in cache_control for directiva in ('private', 'no-store', 'no-cache')):
+            return False
+        return 'max-age' in cache_control or response.has_header('ETag')
+
+    def _comprimir(self, contenido, codificacion):
+        if codificacion == 'br':
+            return brotli.compress(contenido, quality=settings.COMPRESION_BROTLI_CALIDAD)
+        return compress_string(contenido)
+
+    def _comprimir_cacheado(self, contenido, codificacion):
+        clave = f"compresion:{codificacion}:{hashlib.sha256(contenido).hexdigest()}"
+        comprimido = cache.get(clave)
+        if comprimido is None:
+            comprimido = self._comprimir(contenido, codificacion)
+            cache.set(clave, comprimido, settings.COMPRESION_CACHE_TIMEOUT)
+        return comprimido
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:16
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpage', '0002_contacto'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='categoria',
+            index=models.Index(django.db.models.functions.text.Upper('nombre'), name='categoria_nombre_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contacto',
+            index=models.Index(fields=['-fecha_contacto'], name='contacto_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contacto',
+            index=models.Index(fields=['email_enviado', '-fecha_contacto'], name='contacto_enviado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contacto',
+            index=models.Index(fields=['categoria', '-fecha_contacto'], name='contacto_categoria_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fotossubcategoria',
+            index=models.Index(fields=['subcategoria', 'orden', 'fecha_subida'], name='fotos_subcat_orden_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpage', '0003_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoria',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Se incrementa con cada cambio del catálogo de la categoría'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:26
+
+import webpage.imagenes
+import webpage.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpage', '0004_categoria_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='fotossubcategoria',
+            name='imagen',
+            field=models.ImageField(upload_to=webpage.models.upload_to_categoria, validators=[webpage.imagenes.validar_imagen_subida], verbose_name='Imagen'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:43
+
+import webpage.imagenes
+import webpage.models
+import webpage.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpage', '0005_imagen_validadores'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='fotossubcategoria',
+            name='imagen',
+            field=models.ImageField(db_index=True, storage=webpage.storage.storage_fotos, upload_to=webpage.models.upload_to_categoria, validators=[webpage.imagenes.validar_imagen_subida], verbose_name='Imagen'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpage', '0006_imagen_deduplicada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fotossubcategoria',
+            name='imagen_pendiente',
+            field=models.BooleanField(default=False, editable=False, help_text='Importada sin procesar: la imagen original aún no se convirtió a WebP'),
+        ),
+        migrations.AddIndex(
+            model_name='fotossubcategoria',
+            index=models.Index(condition=models.Q(('imagen_pendiente', True)), fields=['imagen'], name='fotos_pendientes_idx'),
+        ),
+    ]
@@ -0,0 +1,96 @@
+from django.db import migrations
+
+# PostgreSQL: columna tsvector generada (se mantiene sola en cada INSERT/UPDATE, también en
+# bulk_create y update()) con índice GIN, e índices de trigramas para buscar fragmentos de
+# email y teléfono con icontains (UPPER(col) LIKE UPPER('%...%')).
+POSTGRES_CREAR = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    ALTER TABLE webpage_contacto ADD COLUMN busqueda tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish', coalesce(nombre, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(email, '')), 'A') ||
+        setweight(to_tsvector('spanish', coalesce(categoria, '')), 'B') ||
+        setweight(to_tsvector('spanish', coalesce(mensaje, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX contacto_busqueda_gin ON webpage_contacto USING gin (busqueda)",
+    "CREATE INDEX contacto_email_trgm ON webpage_contacto USING gin (UPPER(email::text) gin_trgm_ops)",
+    "CREATE INDEX contacto_telefono_trgm ON webpage_contacto USING gin (UPPER(telefono::text) gin_trgm_ops)",
+]
+POSTGRES_BORRAR = [
+    "DROP INDEX IF EXISTS contacto_telefono_trgm",
+    "DROP INDEX IF EXISTS contacto_email_trgm",
+    "DROP INDEX IF EXISTS contacto_busqueda_gin",
+    "ALTER TABLE webpage_contacto DROP COLUMN IF EXISTS busqueda",
+]
+
+# SQLite (desarrollo local): tabla FTS5 de contenido externo sincronizada con triggers.
+# Ojo: una migración que altere Contacto en SQLite reconstruye la tabla y borra los triggers;
+# esa migración debe volver a ejecutar SQLITE_CREAR (sin el CREATE VIRTUAL TABLE) y el 'rebuild'.
+SQLITE_CREAR = [
+    """
+    CREATE VIRTUAL TABLE webpage_contacto_fts USING fts5(
+        nombre, email, telefono, categoria, mensaje,
+        content='webpage_contacto', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER webpage_contacto_fts_ai AFTER INSERT ON webpage_contacto BEGIN
+        INSERT INTO webpage_contacto_fts(rowid, nombre, email, telefono, categoria, mensaje)
+        VALUES (new.id, new.nombre, new.email, new.telefono, new.categoria, new.mensaje);
+    END
+    """,
+    """
+    CREATE TRIGGER webpage_contacto_fts_ad AFTER DELETE ON webpage_contacto BEGIN
+        INSERT INTO webpage_contacto_fts(webpage_contacto_fts, rowid, nombre, email, telefono, categoria, mensaje)
+        VALUES ('delete', old.id, old.nombre, old.email, old.telefono, old.categoria, old.mensaje);
+    END
+    """,
+    """
+    CREATE TRIGGER webpage_contacto_fts_au AFTER UPDATE ON webpage_contacto BEGIN
+        INSERT INTO webpage_contacto_fts(webpage_contacto_fts, rowid, nombre, email, telefono, categoria, mensaje)
+        VALUES ('delete', old.id, old.nombre, old.email, old.telefono, old.categoria, old.mensaje);
+        INSERT INTO webpage_contacto_fts(rowid, nombre, email, telefono, categoria, mensaje)
+        VALUES (new.id, new.nombre, new.email, new.telefono, new.categoria, new.mensaje);
+    END
+    """,
+    "INSERT INTO webpage_contacto_fts(webpage_contacto_fts) VALUES ('rebuild')",
+]
+SQLITE_BORRAR = [
+    "DROP TRIGGER IF EXISTS webpage_contacto_fts_au",
+    "DROP TRIGGER IF EXISTS webpage_contacto_fts_ad",
+    "DROP TRIGGER IF EXISTS webpage_contacto_fts_ai",
+    "DROP TABLE IF EXISTS webpage_contacto_fts",
+]
+
+
+def _ejecutar(schema_editor, sentencias):
+    for sentencia in sentencias:
+        schema_editor.execute(sentencia)
+
+
+def crear_busqueda(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _ejecutar(schema_editor, POSTGRES_CREAR)
+    elif vendor == 'sqlite':
+        _ejecutar(schema_editor, SQLITE_CREAR)
+
+
+def borrar_busqueda(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _ejecutar(schema_editor, POSTGRES_BORRAR)
+    elif vendor == 'sqlite':
+        _ejecutar(schema_editor, SQLITE_BORRAR)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpage', '0007_fotos_pendientes'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_busqueda, borrar_busqueda),
+    ]
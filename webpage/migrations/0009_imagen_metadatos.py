@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpage', '0008_busqueda_contacto'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fotossubcategoria',
+            name='alto',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='fotossubcategoria',
+            name='ancho',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='fotossubcategoria',
+            name='color_dominante',
+            field=models.CharField(blank=True, default='', editable=False, max_length=7),
+        ),
+        migrations.AddField(
+            model_name='fotossubcategoria',
+            name='lqip',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Miniatura borrosa en data URI que se muestra mientras carga la imagen'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webpage', '0009_imagen_metadatos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContactoArchivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('nombre', models.CharField(max_length=100, verbose_name='Nombre')),
+                ('email', models.EmailField(max_length=254, verbose_name='Email')),
+                ('telefono', models.CharField(blank=True, max_length=20, null=True, verbose_name='Teléfono')),
+                ('categoria', models.CharField(blank=True, max_length=100, null=True, verbose_name='Categoría de interés')),
+                ('mensaje', models.TextField(verbose_name='Mensaje')),
+                ('fecha_contacto', models.DateTimeField(verbose_name='Fecha de contacto')),
+                ('email_enviado', models.BooleanField(default=False, verbose_name='Email enviado')),
+                ('fecha_archivado', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de archivado')),
+            ],
+            options={
+                'verbose_name': 'Contacto archivado',
+                'verbose_name_plural': 'Contactos archivados',
+                'ordering': ['-fecha_contacto'],
+                'indexes': [models.Index(fields=['-fecha_contacto'], name='contacto_arch_fecha_idx')],
+            },
+        ),
+    ]
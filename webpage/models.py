@@ -1,13 +1,25 @@
+import logging
 from django.db import models
+from django.db.models.functions import Upper
+from django.core.exceptions import ValidationError
 from django.core.files.uploadedfile import UploadedFile
 from django.core.files.base import ContentFile
-from django.conf import settings
-from PIL import Image as PilImage
+from .imagenes import procesar_imagen_con_metadatos, validar_imagen_subida
+from .storage import storage_fotos
 import os
-import io
+
+logger = logging.getLogger(__name__)
 
 class Categoria(models.Model):
     nombre = models.CharField(max_length=100)
+    version = models.PositiveIntegerField(default=0, editable=False,
+                                          help_text="Se incrementa con cada cambio del catálogo de la categoría")
+
+    class Meta:
+        indexes = [
+            # La vista home busca categorías con nombre__iexact -> UPPER(nombre)
+            models.Index(Upper('nombre'), name='categoria_nombre_upper_idx'),
+        ]
 
     def __str__(self):
         return self.nombre
@@ -29,84 +41,102 @@ def upload_to_categoria(instance, filename):
 
 class FotosSubcategoria(models.Model):
     subcategoria = models.ForeignKey(Subcategoria, on_delete=models.CASCADE, verbose_name='subcategoria')
-    imagen = models.ImageField(upload_to=upload_to_categoria, verbose_name="Imagen")
+    imagen = models.ImageField(upload_to=upload_to_categoria, verbose_name="Imagen",
+                               validators=[validar_imagen_subida], storage=storage_fotos, db_index=True)
     descripcion = models.CharField(max_length=200, blank=True, null=True, verbose_name="Descripción de la imagen")
     orden = models.PositiveIntegerField(default=0, verbose_name="Orden",
                                          help_text="Orden de visualización (0 = primera)")
     fecha_subida = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de subida")
+    imagen_pendiente = models.BooleanField(default=False, editable=False,
+                                           help_text="Importada sin procesar: la imagen original aún no se convirtió a WebP")
+    # Calculados al procesar la imagen (ver webpage.imagenes.metadatos_imagen): permiten maquetar
+    # y mostrar un placeholder antes de descargar la foto
+    ancho = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    alto = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    lqip = models.TextField(blank=True, default='', editable=False,
+                            help_text="Miniatura borrosa en data URI que se muestra mientras carga la imagen")
+    color_dominante = models.CharField(max_length=7, blank=True, default='', editable=False)
 
     class Meta:
         ordering = ['orden', 'fecha_subida']
         verbose_name = "Foto de Subcategoría"
         verbose_name_plural = "Fotos de Subcategorías"
+        indexes = [
+            # Cubre filter(subcategoria=...).order_by('orden', 'fecha_subida')
+            models.Index(fields=['subcategoria', 'orden', 'fecha_subida'], name='fotos_subcat_orden_idx'),
+            # Cola de procesamiento de imágenes importadas: solo indexa las pendientes
+            models.Index(fields=['imagen'], condition=models.Q(imagen_pendiente=True), name='fotos_pendientes_idx'),
+        ]
 
     def __str__(self):
         return f"Foto {self.orden + 1} - {self.subcategoria.nombre}"
 
 
-    def _process_image(self, image_field, target_width=1200, target_height=800, quality=85):
+    def clean_fields(self, exclude=None):
         """
-        Procesa una imagen de evento: la redimensiona y la convierte a WebP.
-        Soporta formatos HEIC si pillow-heif está instalado.
+        El validador del campo solo lee la cabecera: aquí se decodifica y convierte la imagen
+        recién subida, para que un archivo corrupto o truncado sea un error del formulario y
+        no una excepción en save(). El resultado se reutiliza al guardar.
         """
-        if not image_field:
-            return None
+        errores = {}
+        try:
+            super().clean_fields(exclude=exclude)
+        except ValidationError as e:
+            errores = e.update_error_dict(errores)
+        if 'imagen' not in errores and not (exclude and 'imagen' in exclude):
+            try:
+                self._process_image(self.imagen)
+            except ValidationError as e:
+                errores['imagen'] = e.error_list
+        if errores:
+            raise ValidationError(errores)
 
+    def _process_image(self, image_field, target_width=1200, target_height=800, quality=85):
+        """
+        Procesa una imagen de evento: la redimensiona y la convierte a WebP. Devuelve los bytes
+        WebP, o None si no es un archivo recién subido. Soporta HEIC si pillow-heif está instalado.
+        La decodificación usa memoria acotada (ver webpage.imagenes.procesar_imagen) y las
+        imágenes inválidas o que exceden los límites se rechazan con ValidationError.
+        """
         # Solo procesar si es un archivo recién subido
-        if not isinstance(image_field.file, UploadedFile):
-            return image_field
+        if not image_field or image_field._committed or not isinstance(image_field.file, UploadedFile):
+            return None
 
-        try:
-            # Verificar que el directorio de destino existe (importante para volumen persistente)
-            categoria_nombre = self.subcategoria.categoria.nombre.lower()
-            upload_path = categoria_nombre
-            full_upload_path = os.path.join(settings.MEDIA_ROOT, upload_path)
-            if not os.path.exists(full_upload_path):
-                os.makedirs(full_upload_path, exist_ok=True)
-
-            # Detectar formato HEIC por extensión del archivo
-            original_filename = getattr(image_field, 'name', '')
-            file_extension = os.path.splitext(original_filename.lower())[1]
-
-            # Abrir la imagen, pillow-heif manejará automáticamente HEIC si está registrado
-            img = PilImage.open(image_field)
-
-            # Convertir a RGB si es necesario
-            if img.mode in ('RGBA', 'P', 'CMYK', 'LAB'):
-                img = img.convert('RGB')
-
-            # Redimensionar manteniendo la relación de aspecto
-            img.thumbnail((target_width, target_height), PilImage.Resampling.LANCZOS)
-
-            # Guardar en formato WebP
-            buffer = io.BytesIO()
-            img.save(buffer, format='WEBP', quality=quality)
-            buffer.seek(0)
-
-            # Crear nuevo nombre de archivo
-            original_filename = image_field.name
-            base_name = os.path.splitext(os.path.basename(original_filename))[0]
-            categoria_nombre = self.subcategoria.categoria.nombre.lower()
-            webp_filename = f"{categoria_nombre}/{base_name}.webp"
-
-            return ContentFile(buffer.getvalue(), name=webp_filename)
-
-        except Exception as e:
-            print(f"Error procesando imagen del evento {image_field.name}: {e}")
-            if 'heic' in str(e).lower() or 'heif' in str(e).lower():
-                print("Nota: Para soporte HEIC, instale: pip install pillow-heif")
-            return image_field
+        # Ya procesada en clean_fields(); la subcategoría (para el nombre) puede no estar
+        # asignada todavía al validar, por ejemplo en un inline de una subcategoría nueva
+        procesada = getattr(self, '_imagen_procesada', None)
+        if procesada and procesada[0] is image_field.file:
+            contenido = procesada[1]
+        else:
+            try:
+                contenido, metadatos = procesar_imagen_con_metadatos(image_field, target_width, target_height, quality)
+            except ValidationError as e:
+                logger.warning("Imagen rechazada al procesarla", extra={'imagen': image_field.name, 'error': str(e)})
+                raise
+            for campo, valor in metadatos.items():
+                setattr(self, campo, valor)
+            self._imagen_procesada = (image_field.file, contenido)
+        return contenido
+
+    def _nombre_webp(self, image_field):
+        # Nombre provisional: el storage 'fotos' lo reemplaza por el hash del contenido
+        base_name = os.path.splitext(os.path.basename(image_field.name))[0]
+        return f"{self.subcategoria.categoria.nombre.lower()}/{base_name}.webp"
 
     def save(self, *args, **kwargs):
         # Auto-llenar descripciones vacías con el nombre de la subcategoría
         if not self.descripcion and self.subcategoria:
             self.descripcion = self.subcategoria.nombre
 
-        # Procesar la imagen si es nueva
+        # Procesar la imagen si es nueva (los formularios ya lo hicieron al validar)
         if self.imagen and self.imagen.name:
-            processed_image = self._process_image(self.imagen)
-            if processed_image:
-                self.imagen = processed_image
+            try:
+                processed_image = self._process_image(self.imagen)
+            except ValidationError as e:
+                # Quien guarda sin full_clean() recibe un error de programación, no de formulario
+                raise ValueError(f"Imagen no válida; validar con full_clean() antes de guardar: {e}") from e
+            if processed_image is not None:
+                self.imagen = ContentFile(processed_image, name=self._nombre_webp(self.imagen))
 
         super().save(*args, **kwargs)
 
@@ -123,6 +153,40 @@ class Contacto(models.Model):
         ordering = ['-fecha_contacto']
         verbose_name = "Contacto"
         verbose_name_plural = "Contactos"
+        indexes = [
+            # Listado del admin ordenado por fecha y filtros laterales
+            models.Index(fields=['-fecha_contacto'], name='contacto_fecha_idx'),
+            models.Index(fields=['email_enviado', '-fecha_contacto'], name='contacto_enviado_fecha_idx'),
+            models.Index(fields=['categoria', '-fecha_contacto'], name='contacto_categoria_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre} - {self.fecha_contacto.strftime('%d/%m/%Y %H:%M')}"
+
+
+class ContactoArchivado(models.Model):
+    """
+    Contactos antiguos que webpage.retencion saca de Contacto para que la tabla caliente (la
+    del admin y sus COUNT(*)) no crezca con el historial. Conserva el id original y solo
+    tiene el índice por fecha: se consulta y exporta bajo demanda.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    nombre = models.CharField(max_length=100, verbose_name="Nombre")
+    email = models.EmailField(verbose_name="Email")
+    telefono = models.CharField(max_length=20, blank=True, null=True, verbose_name="Teléfono")
+    categoria = models.CharField(max_length=100, blank=True, null=True, verbose_name="Categoría de interés")
+    mensaje = models.TextField(verbose_name="Mensaje")
+    fecha_contacto = models.DateTimeField(verbose_name="Fecha de contacto")
+    email_enviado = models.BooleanField(default=False, verbose_name="Email enviado")
+    fecha_archivado = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de archivado")
+
+    class Meta:
+        ordering = ['-fecha_contacto']
+        verbose_name = "Contacto archivado"
+        verbose_name_plural = "Contactos archivados"
+        indexes = [
+            models.Index(fields=['-fecha_contacto'], name='contacto_arch_fecha_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.nombre} - {self.fecha_contacto.strftime('%d/%m/%Y %H:%M')}"
\ No newline at end of file
+        return f"{self.nombre} - {self.fecha_contacto.strftime('%d/%m/%Y %H:%M')}"
@@ -0,0 +1,40 @@
+import logging
+import os
+from django.template import engines
+from django.template.exceptions import TemplateDoesNotExist, TemplateSyntaxError
+
+logger = logging.getLogger(__name__)
+
+
+def precompilar_plantillas():
+    """
+    Compila todas las plantillas de los motores Django al arrancar el worker.
+    Con el cargador cacheado, las primeras peticiones ya no pagan el parseo de las plantillas.
+    Devuelve la cantidad de plantillas compiladas.
+    """
+    compiladas = 0
+    for engine in engines.all():
+        motor = getattr(engine, 'engine', None)
+        if motor is None:
+            continue
+
+        nombres = set()
+        for loader in motor.template_loaders:
+            for directorio in loader.get_dirs():
+                directorio = str(directorio)
+                if not os.path.isdir(directorio):
+                    continue
+                for raiz, _, archivos in os.walk(directorio):
+                    for archivo in archivos:
+                        if archivo.endswith(('.html', '.txt', '.xml')):
+                            ruta = os.path.relpath(os.path.join(raiz, archivo), directorio)
+                            nombres.add(ruta.replace(os.sep, '/'))
+
+        for nombre in sorted(nombres):
+            try:
+                motor.get_template(nombre)
+                compiladas += 1
+            except (TemplateDoesNotExist, TemplateSyntaxError) as e:
+                logger.warning("No se pudo precompilar la plantilla", extra={'plantilla': nombre, 'error': str(e)})
+
+    return compiladas
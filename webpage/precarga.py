@@ -0,0 +1,120 @@
+import logging
+import re
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.templatetags.static import static
+from django.urls import reverse
+from .catalogo_busqueda import CLAVE_VERSION_CATALOGO
+from .models import Categoria
+
+logger = logging.getLogger(__name__)
+
+# Enlaces de la home calculados en este proceso: (versión del catálogo, instante, lista)
+_enlaces = None
+
+
+def _enlace(url, **parametros):
+    """Valor de cabecera Link (RFC 8288): parámetros con valor True se escriben sin valor"""
+    partes = [f'<{url}>']
+    for nombre, valor in parametros.items():
+        if valor is True:
+            partes.append(nombre)
+        elif re.fullmatch(r'[\w.-]+', valor):
+            partes.append(f'{nombre}={valor}')
+        else:
+            partes.append(f'{nombre}="{valor}"')
+    return '; '.join(partes)
+
+
+def calcular_enlaces_home():
+    """
+    Recursos críticos de la home en orden de prioridad: conexiones a los orígenes externos
+    (fuentes), la imagen LCP, home.css y el logo, y por último, con prioridad baja, la foto
+    destacada visible de las primeras categorías del catálogo.
+    """
+    from .templatetags.static_extras import datos_preload
+    from .views import obtener_fotos_destacadas
+
+    enlaces = [
+        _enlace(origen, rel='preconnect', **({'crossorigin': True} if crossorigin else {}))
+        for origen, crossorigin in settings.PRECARGA_ORIGENES.items()
+    ]
+    enlaces.append(_enlace(settings.FUENTES_URL, rel='preload', **{'as': 'style'}))
+
+    datos = datos_preload(settings.PRECARGA_IMAGEN_LCP)
+    href = datos.pop('href')
+    enlaces.append(_enlace(href, rel='preload', **{'as': 'image'}, **datos, fetchpriority='high'))
+
+    for ruta, tipo in settings.PRECARGA_ESTATICOS.items():
+        enlaces.append(_enlace(static(ruta), rel='preload', **{'as': tipo}))
+
+    if settings.PRECARGA_CATEGORIAS:
+        destacadas = obtener_fotos_destacadas()
+        # Cada categoría muestra solo la tarjeta de su primera subcategoría
+        for categoria in Categoria.objects.prefetch_related('subcategoria_set')[:settings.PRECARGA_CATEGORIAS]:
+            subcategoria = next(iter(categoria.subcategoria_set.all()), None)
+            foto = destacadas.get(subcategoria.id) if subcategoria else None
+            if foto and foto.imagen:
+                enlaces.append(_enlace(foto.imagen.url, rel='preload', **{'as': 'image'}, fetchpriority='low'))
+    return enlaces
+
+
+def enlaces_home():
+    """
+    Enlaces de precarga de la home, guardados en memoria mientras no cambie la versión
+    compartida del catálogo (y como mucho CATALOGO_BUSQUEDA_REVALIDAR segundos, por si la
+    caché perdió el contador). Se piden antes de ejecutar la vista: no pueden costar una
+    consulta por petición.
+    """
+    global _enlaces
+    version = cache.get(CLAVE_VERSION_CATALOGO)
+    ahora = time.monotonic()
+    if (_enlaces is None or _enlaces[0] != version
+            or ahora - _enlaces[1] >= settings.CATALOGO_BUSQUEDA_REVALIDAR or settings.DEBUG):
+        _enlaces = (version, ahora, calcular_enlaces_home())
+    return _enlaces[2]
+
+
+class PrecargaMiddleware:
+    """
+    Añade a la respuesta de la home la cabecera Link con los recursos críticos y, si el
+    servidor WSGI ofrece environ['wsgi.early_hints'], los envía antes como 103 Early Hints
+    para que el navegador empiece a descargarlos mientras Django genera la página. Sin ese
+    soporte, las CDN que convierten Link en 103 (p. ej. Cloudflare) consiguen lo mismo.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._ruta_home = None
+
+    def __call__(self, request):
+        if not settings.PRECARGA_ACTIVA or request.method not in ('GET', 'HEAD'):
+            return self.get_response(request)
+        if self._ruta_home is None:
+            self._ruta_home = reverse('webpage:home')
+        if request.path != self._ruta_home:
+            return self.get_response(request)
+        # Solo en desarrollo: medir_lcp compara la misma página con y sin precarga
+        if settings.DEBUG and request.headers.get('X-Sin-Precarga'):
+            return self.get_response(request)
+
+        try:
+            enlaces = enlaces_home()
+        except Exception:
+            # La precarga es una optimización: la página se sirve igual sin ella
+            logger.exception("Error calculando los enlaces de precarga")
+            enlaces = []
+
+        early_hints = request.META.get('wsgi.early_hints')
+        if enlaces and callable(early_hints):
+            try:
+                early_hints([('Link', enlace) for enlace in enlaces])
+            except OSError as e:
+                logger.warning("Error enviando 103 Early Hints", extra={'error': str(e)})
+
+        response = self.get_response(request)
+        if enlaces and response.status_code == 200:
+            existentes = [response['Link']] if response.has_header('Link') else []
+            response['Link'] = ', '.join(existentes + enlaces)
+        return response
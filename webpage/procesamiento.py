@@ -0,0 +1,118 @@
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db import connection
+from .imagenes import metadatos_archivo, procesar_imagen_con_metadatos
+from .cdn import CLAVE_CATALOGO, clave_subcategoria, purgar
+from .models import FotosSubcategoria
+from .signals import eliminar_imagen_sin_referencias, incrementar_version_categoria
+
+logger = logging.getLogger(__name__)
+
+# Un solo hilo: las imágenes se procesan de una en una para acotar la memoria del worker
+_cola = ThreadPoolExecutor(max_workers=1, thread_name_prefix='fotos-pendientes')
+
+
+def procesar_fotos_pendientes(lote=50):
+    """
+    Convierte a WebP las fotos marcadas con imagen_pendiente (importadas sin procesar).
+    Cada archivo original se procesa una sola vez aunque varias filas lo usen; las filas se
+    actualizan con update() y el original se libera si ya nadie lo referencia.
+    Devuelve (procesadas, fallidas) en número de archivos.
+    """
+    storage = FotosSubcategoria._meta.get_field('imagen').storage
+    procesadas, fallidas = 0, set()
+    while True:
+        pendientes = list(
+            FotosSubcategoria.objects.filter(imagen_pendiente=True).exclude(imagen__in=fallidas)
+            .order_by('imagen').values_list('imagen', flat=True).distinct()[:lote]
+        )
+        if not pendientes:
+            break
+        categorias, subcategorias = set(), set()
+        for nombre in pendientes:
+            try:
+                with storage.open(nombre) as archivo:
+                    contenido, metadatos = procesar_imagen_con_metadatos(archivo)
+                nuevo = storage.save(posixpath.splitext(nombre)[0] + '.webp', ContentFile(contenido))
+            except (ValidationError, OSError) as e:
+                logger.warning("Error procesando imagen importada", extra={'imagen': nombre, 'error': str(e)})
+                fallidas.add(nombre)
+                continue
+            filas = FotosSubcategoria.objects.filter(imagen=nombre, imagen_pendiente=True)
+            for subcategoria_id, categoria_id in filas.values_list('subcategoria_id', 'subcategoria__categoria_id'):
+                subcategorias.add(subcategoria_id)
+                categorias.add(categoria_id)
+            filas.update(imagen=nuevo, imagen_pendiente=False, **metadatos)
+            eliminar_imagen_sin_referencias(nombre)
+            procesadas += 1
+        # Una invalidación por categoría y lote, no por imagen
+        for categoria_id in categorias:
+            incrementar_version_categoria(categoria_id)
+        if subcategorias:
+            purgar(CLAVE_CATALOGO, *map(clave_subcategoria, subcategorias))
+    return procesadas, len(fallidas)
+
+
+def completar_metadatos(lote=100, todas=False):
+    """
+    Calcula ancho, alto, LQIP y color dominante de las fotos ya procesadas que no los tienen
+    (anteriores a estos campos, o importadas con un archivo ya direccionado por contenido);
+    con todas=True los recalcula para todas. Cada archivo se lee una sola vez aunque varias
+    filas lo usen. Devuelve (completadas, fallidas) en número de archivos.
+    """
+    storage = FotosSubcategoria._meta.get_field('imagen').storage
+    fotos = FotosSubcategoria.objects.filter(imagen_pendiente=False)
+    if not todas:
+        fotos = fotos.filter(ancho__isnull=True)
+    completadas, fallidas, ultima = 0, 0, ''
+    while True:
+        # Paginación por nombre: con todas=True las filas actualizadas siguen cumpliendo el filtro
+        nombres = list(
+            fotos.filter(imagen__gt=ultima).order_by('imagen')
+            .values_list('imagen', flat=True).distinct()[:lote]
+        )
+        if not nombres:
+            break
+        categorias, subcategorias = set(), set()
+        for nombre in nombres:
+            try:
+                with storage.open(nombre) as archivo:
+                    metadatos = metadatos_archivo(archivo)
+            except (ValidationError, OSError) as e:
+                logger.warning("Error leyendo metadatos de la imagen", extra={'imagen': nombre, 'error': str(e)})
+                fallidas += 1
+                continue
+            filas = fotos.filter(imagen=nombre)
+            for subcategoria_id, categoria_id in filas.values_list('subcategoria_id', 'subcategoria__categoria_id'):
+                subcategorias.add(subcategoria_id)
+                categorias.add(categoria_id)
+            filas.update(**metadatos)
+            completadas += 1
+        ultima = nombres[-1]
+        for categoria_id in categorias:
+            incrementar_version_categoria(categoria_id)
+        if subcategorias:
+            purgar(CLAVE_CATALOGO, *map(clave_subcategoria, subcategorias))
+    return completadas, fallidas
+
+
+def _procesar_en_segundo_plano():
+    try:
+        procesar_fotos_pendientes()
+        completar_metadatos()
+    finally:
+        # El hilo tiene su propia conexión: no dejarla abierta
+        connection.close()
+
+
+def encolar_fotos_pendientes():
+    """
+    Procesa las fotos pendientes (y completa los metadatos que falten) en un hilo del worker,
+    fuera de la petición.
+    Si el worker se reinicia antes de terminar, las filas siguen marcadas y el comando
+    procesar_imagenes_pendientes las completa.
+    """
+    _cola.submit(_procesar_en_segundo_plano)
@@ -0,0 +1,160 @@
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Datos de la petición en curso; los añade FiltroContexto a cada registro
+_request_id = ContextVar('request_id', default=None)
+_ruta = ContextVar('ruta', default=None)
+_metodo = ContextVar('metodo', default=None)
+
+# Atributos propios de LogRecord: todo lo demás llegó por extra={...}
+_ATRIBUTOS_RECORD = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'muestreo'}
+
+logger = logging.getLogger(__name__)
+
+
+class FiltroContexto(logging.Filter):
+    """Añade request_id, ruta y método de la petición en curso (se ejecuta en el hilo de la petición)"""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        record.ruta = _ruta.get()
+        record.metodo = _metodo.get()
+        # django.request registra los 4xx/5xx cuando el middleware ya terminó: usar su `request`
+        request = vars(record).pop('request', None)
+        if record.request_id is None and request is not None:
+            record.request_id = getattr(request, 'request_id', None)
+            coincidencia = getattr(request, 'resolver_match', None)
+            record.ruta = '/' + coincidencia.route if coincidencia and coincidencia.route else request.path
+            record.metodo = request.method
+        return True
+
+
+class FiltroMuestreo(logging.Filter):
+    """
+    Deja pasar solo una fracción de los eventos de DEBUG (`tasa`, entre 0 y 1) para que los
+    de alto volumen no saturen la salida. Un registro puede fijar su propia tasa con
+    extra={'muestreo': 0.01}, sea del nivel que sea.
+    """
+
+    def __init__(self, tasa=1.0):
+        super().__init__()
+        self.tasa = float(tasa)
+
+    def filter(self, record):
+        tasa = getattr(record, 'muestreo', None)
+        if tasa is None:
+            if record.levelno > logging.DEBUG:
+                return True
+            tasa = self.tasa
+        return tasa >= 1 or random.random() < tasa
+
+
+class FormatoJSON(logging.Formatter):
+    """Una línea JSON por evento: ts, nivel, logger, mensaje, contexto de la petición y los extra"""
+
+    def format(self, record):
+        datos = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensaje': record.getMessage(),
+        }
+        for campo, valor in vars(record).items():
+            if campo not in _ATRIBUTOS_RECORD and valor is not None:
+                datos[campo] = valor
+        if record.exc_info:
+            datos['excepcion'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            datos['excepcion'] = record.exc_text
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class ManejadorCola(QueueHandler):
+    """
+    QueueHandler con su propio QueueListener: el hilo de la petición solo formatea y encola,
+    y un hilo aparte escribe en `stream` (por defecto stderr, para no mezclarse con los datos
+    que los comandos escriben en stdout). Si la cola se llena (salida atascada) los eventos
+    se descartan y se cuentan, en lugar de bloquear al worker.
+    """
+
+    def __init__(self, capacidad=10000, stream=None):
+        super().__init__(queue.Queue(capacidad))
+        self.stream = stream
+        self.descartados = 0
+        self._listener = None
+        self._pid = None
+
+    def _iniciar(self):
+        # Cola nueva en cada proceso: la heredada del fork puede tener su lock tomado
+        self.queue = queue.Queue(self.queue.maxsize)
+        salida = logging.StreamHandler(self.stream or sys.stderr)
+        salida.setFormatter(logging.Formatter('%(message)s'))
+        self._listener = QueueListener(self.queue, salida)
+        self._listener.start()
+        self._pid = os.getpid()
+
+    def enqueue(self, record):
+        # El hilo del listener no sobrevive al fork (gunicorn --preload): cada proceso arranca el suyo
+        if self._pid != os.getpid():
+            self._iniciar()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+    def prepare(self, record):
+        record = super().prepare(record)
+        if self.descartados:
+            record.msg = json.dumps({**json.loads(record.msg), 'descartados': self.descartados}, ensure_ascii=False)
+            self.descartados = 0
+        return record
+
+    def close(self):
+        # logging.shutdown() cierra los handlers al salir: se escribe lo que quede en la cola
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+        super().close()
+
+
+class RegistroPeticionesMiddleware:
+    """
+    Asigna un request_id (el de la cabecera X-Request-ID si viene del proxy), lo expone en la
+    respuesta y registra una línea por petición con ruta, estado y duración. Los estáticos y
+    media se registran en DEBUG, sujetos al muestreo.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        from django.conf import settings
+        self._prefijos_archivos = tuple(p for p in (settings.STATIC_URL, settings.MEDIA_URL) if p)
+
+    def __call__(self, request):
+        request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        request.request_id = request_id
+        tokens = (_request_id.set(request_id), _ruta.set(request.path), _metodo.set(request.method))
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            # Con la URL resuelta, la ruta es el patrón ('api/subcategoria/<int:subcategoria_id>/fotos/')
+            if getattr(request, 'resolver_match', None) and request.resolver_match.route:
+                _ruta.set('/' + request.resolver_match.route)
+            nivel = logging.DEBUG if request.path.startswith(self._prefijos_archivos) else logging.INFO
+            logger.log(nivel, 'peticion', extra={
+                'estado': response.status_code,
+                'duracion_ms': round((time.perf_counter() - inicio) * 1000, 2),
+            })
+            response['X-Request-ID'] = request_id
+            return response
+        finally:
+            for variable, token in zip((_request_id, _ruta, _metodo), tokens):
+                variable.reset(token)
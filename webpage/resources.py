@@ -0,0 +1,166 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from import_export import fields, resources, widgets
+from import_export.instance_loaders import CachedInstanceLoader
+from .models import Categoria, Contacto, ContactoArchivado, FotosSubcategoria, Subcategoria
+
+
+class ContactoResource(resources.ModelResource):
+    class Meta:
+        model = Contacto
+        fields = ('id', 'nombre', 'email', 'telefono', 'categoria', 'mensaje', 'fecha_contacto', 'email_enviado')
+
+    def get_queryset(self):
+        return Contacto.objects.order_by('-fecha_contacto')
+
+
+class ContactoArchivadoResource(resources.ModelResource):
+    class Meta:
+        model = ContactoArchivado
+        fields = ('id', 'nombre', 'email', 'telefono', 'categoria', 'mensaje', 'fecha_contacto', 'email_enviado')
+
+    def get_queryset(self):
+        return ContactoArchivado.objects.order_by('-fecha_contacto')
+
+
+class SubcategoriaPorNombreWidget(widgets.ForeignKeyWidget):
+    """
+    Resuelve la subcategoría por (categoría, subcategoría) con el diccionario que prepara
+    FotosSubcategoriaResource.before_import, sin una consulta por fila.
+    """
+
+    def __init__(self):
+        super().__init__(Subcategoria, field='nombre')
+        self.subcategorias = {}
+
+    def clean(self, value, row=None, **kwargs):
+        if not value:
+            raise ValueError("La subcategoría es obligatoria.")
+        clave = (str(row.get('categoria') or '').strip().lower(), str(value).strip().lower())
+        try:
+            return self.subcategorias[clave]
+        except KeyError:
+            raise ValueError(f"No existe la subcategoría {value} en la categoría {row.get('categoria')}.")
+
+
+class FotosSubcategoriaResource(resources.ModelResource):
+    """
+    Catálogo aplanado: una fila por foto con su categoría y subcategoría.
+    Al importar, las categorías y subcategorías nuevas se crean por nombre; las fotos se
+    escriben con bulk_create/bulk_update y las imágenes nuevas quedan en imagen_pendiente
+    para procesarse después, en vez de ejecutar FotosSubcategoria.save() por fila.
+    """
+    categoria = fields.Field(attribute='subcategoria__categoria__nombre', column_name='categoria', readonly=True)
+    subcategoria = fields.Field(attribute='subcategoria', column_name='subcategoria',
+                                widget=SubcategoriaPorNombreWidget())
+    fecha_subida = fields.Field(attribute='fecha_subida', column_name='fecha_subida', readonly=True,
+                                widget=widgets.DateTimeWidget())
+
+    class Meta:
+        model = FotosSubcategoria
+        fields = ('id', 'categoria', 'subcategoria', 'descripcion', 'orden', 'imagen', 'fecha_subida')
+        use_bulk = True
+        batch_size = 1000
+        skip_unchanged = True
+        report_skipped = True
+        instance_loader_class = CachedInstanceLoader
+
+    def get_queryset(self):
+        return (FotosSubcategoria.objects.select_related('subcategoria__categoria')
+                .order_by('subcategoria__categoria__nombre', 'subcategoria__nombre', 'orden'))
+
+    def get_bulk_update_fields(self):
+        return ['subcategoria', 'descripcion', 'orden', 'imagen', 'imagen_pendiente']
+
+    def before_import(self, dataset, **kwargs):
+        # Los archivos nuevos del catálogo no tienen id: todas sus filas son altas
+        if 'id' not in dataset.headers:
+            dataset.append_col([''] * len(dataset), header='id')
+        if 'categoria' not in dataset.headers or 'subcategoria' not in dataset.headers:
+            raise ValueError("El archivo debe tener las columnas categoria y subcategoria.")
+
+        self._storage = FotosSubcategoria._meta.get_field('imagen').storage
+        self._categorias_afectadas = set()
+        self._subcategorias_afectadas = set()
+        self._imagenes_reemplazadas = []
+        self.categorias_creadas, self.subcategorias_creadas = self._crear_categorias(dataset)
+
+    def _crear_categorias(self, dataset):
+        """Crea en bloque las categorías y subcategorías que aún no existen (comparando sin mayúsculas)"""
+        pares = {}
+        for categoria, subcategoria in zip(dataset['categoria'], dataset['subcategoria']):
+            categoria, subcategoria = str(categoria or '').strip(), str(subcategoria or '').strip()
+            if categoria and subcategoria:
+                pares.setdefault((categoria.lower(), subcategoria.lower()), (categoria, subcategoria))
+
+        categorias = {c.nombre.lower(): c for c in Categoria.objects.all()}
+        nuevas = {}
+        for categoria, _ in pares.values():
+            if categoria.lower() not in categorias:
+                nuevas.setdefault(categoria.lower(), Categoria(nombre=categoria))
+        Categoria.objects.bulk_create(nuevas.values())
+        categorias.update(nuevas)
+
+        subcategorias = {
+            (s.categoria.nombre.lower(), s.nombre.lower()): s
+            for s in Subcategoria.objects.select_related('categoria')
+        }
+        nuevas_sub = [
+            Subcategoria(categoria=categorias[clave[0]], nombre=subcategoria)
+            for clave, (_, subcategoria) in pares.items() if clave not in subcategorias
+        ]
+        Subcategoria.objects.bulk_create(nuevas_sub)
+        subcategorias.update({(s.categoria.nombre.lower(), s.nombre.lower()): s for s in nuevas_sub})
+
+        self.fields['subcategoria'].widget.subcategorias = subcategorias
+        return len(nuevas), len(nuevas_sub)
+
+    def import_instance(self, instance, row, **kwargs):
+        imagen_anterior = instance.imagen.name if instance.pk else None
+        subcategoria_anterior = instance.subcategoria_id if instance.pk else None
+        super().import_instance(instance, row, **kwargs)
+
+        nombre = instance.imagen.name
+        if not nombre:
+            raise ValidationError({'imagen': "La imagen es obligatoria."})
+        if nombre != imagen_anterior and not self._storage.exists(nombre):
+            raise ValidationError({'imagen': f"No existe el archivo {nombre} en el volumen de media."})
+        # Igual que FotosSubcategoria.save(): descripción vacía -> nombre de la subcategoría
+        if not instance.descripcion:
+            instance.descripcion = instance.subcategoria.nombre
+        if nombre != imagen_anterior:
+            instance.imagen_pendiente = not self._storage.es_direccionado(nombre)
+            if imagen_anterior:
+                self._imagenes_reemplazadas.append(imagen_anterior)
+        # Una foto que cambia de subcategoría también cambia la API de fotos de la anterior
+        if subcategoria_anterior and subcategoria_anterior != instance.subcategoria_id:
+            self._subcategorias_afectadas.add(subcategoria_anterior)
+
+    def after_save_instance(self, instance, row, **kwargs):
+        self._categorias_afectadas.add(instance.subcategoria.categoria_id)
+        self._subcategorias_afectadas.add(instance.subcategoria_id)
+
+    def after_import(self, dataset, result, **kwargs):
+        # bulk_create/bulk_update no envían señales: invalidar aquí la caché del catálogo
+        if kwargs.get('dry_run') or result.has_errors() or result.has_validation_errors():
+            return
+        from .cdn import CLAVE_CATALOGO, clave_subcategoria, purgar
+        from .procesamiento import encolar_fotos_pendientes
+        from .signals import eliminar_imagen_sin_referencias, incrementar_version_categoria
+
+        categorias = self._categorias_afectadas | set(
+            Subcategoria.objects.filter(pk__in=self._subcategorias_afectadas).values_list('categoria_id', flat=True)
+        )
+        for categoria_id in categorias:
+            incrementar_version_categoria(categoria_id)
+        if self._subcategorias_afectadas:
+            purgar(CLAVE_CATALOGO, *map(clave_subcategoria, self._subcategorias_afectadas))
+        reemplazadas = list(self._imagenes_reemplazadas)
+
+        def liberar_reemplazadas():
+            for nombre in reemplazadas:
+                eliminar_imagen_sin_referencias(nombre)
+
+        transaction.on_commit(liberar_reemplazadas)
+        if kwargs.get('encolar_imagenes', True):
+            transaction.on_commit(encolar_fotos_pendientes)
@@ -0,0 +1,80 @@
+import datetime
+import logging
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+from .models import Contacto, ContactoArchivado
+
+logger = logging.getLogger(__name__)
+
+CAMPOS = ('id', 'nombre', 'email', 'telefono', 'categoria', 'mensaje', 'fecha_contacto', 'email_enviado')
+
+
+def fecha_limite(dias=None):
+    """Los contactos anteriores a esta fecha pasan al archivo"""
+    dias = settings.CONTACTOS_RETENCION_DIAS if dias is None else dias
+    return timezone.now() - datetime.timedelta(days=dias)
+
+
+def archivar_contactos(dias=None, lote=None):
+    """
+    Mueve a ContactoArchivado los contactos con más de `dias` días (CONTACTOS_RETENCION_DIAS).
+    Cada lote se copia y se borra de Contacto en su propia transacción: los bloqueos duran poco
+    y un corte a mitad deja cada fila en una de las dos tablas, nunca en ninguna.
+    Devuelve el número de contactos archivados.
+    """
+    limite = fecha_limite(dias)
+    lote = lote or settings.CONTACTOS_ARCHIVO_LOTE
+    total = 0
+    while True:
+        with transaction.atomic():
+            filas = list(
+                Contacto.objects.filter(fecha_contacto__lt=limite)
+                .order_by('fecha_contacto', 'id').values(*CAMPOS)[:lote]
+            )
+            if not filas:
+                break
+            _copiar(ContactoArchivado, filas)
+            Contacto.objects.filter(pk__in=[fila['id'] for fila in filas]).delete()
+        total += len(filas)
+    if total:
+        logger.info("Contactos archivados", extra={'contactos': total, 'limite': limite.isoformat()})
+    return total
+
+
+def restaurar_contactos(archivados, lote=None):
+    """
+    Devuelve a Contacto (con su id y fecha originales) los contactos archivados del queryset,
+    en lotes de CONTACTOS_ARCHIVO_LOTE ordenados por id, cada uno en su propia transacción
+    como en archivar_contactos(). Devuelve el número de contactos restaurados.
+    """
+    lote = lote or settings.CONTACTOS_ARCHIVO_LOTE
+    total, ultimo = 0, None
+    while True:
+        with transaction.atomic():
+            pendientes = archivados.order_by('id')
+            if ultimo is not None:
+                pendientes = pendientes.filter(id__gt=ultimo)
+            filas = list(pendientes.values(*CAMPOS)[:lote])
+            if not filas:
+                break
+            ids = [fila['id'] for fila in filas]
+            _copiar(Contacto, filas)
+            # auto_now_add pone la fecha actual al insertar: devolver la original en un solo UPDATE
+            Contacto.objects.filter(pk__in=ids).update(fecha_contacto=Case(
+                *(When(pk=fila['id'], then=Value(fila['fecha_contacto'])) for fila in filas),
+                output_field=DateTimeField(),
+            ))
+            archivados.model.objects.filter(pk__in=ids).delete()
+        total += len(filas)
+        ultimo = ids[-1]
+    return total
+
+
+def _copiar(modelo, filas):
+    # Si el id ya existe en el destino (archivado, restaurado y vuelto a archivar) gana la copia nueva
+    modelo.objects.bulk_create(
+        [modelo(**fila) for fila in filas],
+        update_conflicts=True, unique_fields=['id'], update_fields=CAMPOS[1:],
+    )
@@ -0,0 +1,106 @@
+import logging
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .catalogo_busqueda import marcar_desactualizado
+from .cdn import CLAVE_CATALOGO, clave_categoria, clave_subcategoria, purgar
+from .models import Categoria, Subcategoria, FotosSubcategoria
+
+logger = logging.getLogger(__name__)
+
+
+def incrementar_version_categoria(categoria_id):
+    """
+    Incrementa la versión de una categoría para invalidar sus fragmentos de plantilla cacheados.
+    Usa update() para no disparar de nuevo las señales de Categoria.
+    """
+    if categoria_id:
+        Categoria.objects.filter(pk=categoria_id).update(version=F('version') + 1)
+        marcar_desactualizado()
+
+
+@receiver(post_delete, sender=Categoria)
+def categoria_eliminada(sender, instance, **kwargs):
+    marcar_desactualizado()
+    purgar(CLAVE_CATALOGO, clave_categoria(instance.pk))
+
+
+@receiver(post_save, sender=Categoria)
+def categoria_guardada(sender, instance, raw=False, **kwargs):
+    if not raw:
+        incrementar_version_categoria(instance.pk)
+        # El nombre de la categoría aparece en la API de fotos de todas sus subcategorías
+        purgar(CLAVE_CATALOGO, clave_categoria(instance.pk))
+
+
+@receiver(pre_save, sender=Subcategoria)
+def subcategoria_cambia_categoria(sender, instance, raw=False, **kwargs):
+    # Si la subcategoría se mueve de categoría, la categoría anterior también cambia
+    if raw or not instance.pk:
+        return
+    categoria_anterior = Subcategoria.objects.filter(pk=instance.pk).values_list('categoria_id', flat=True).first()
+    if categoria_anterior and categoria_anterior != instance.categoria_id:
+        incrementar_version_categoria(categoria_anterior)
+
+
+@receiver(post_save, sender=Subcategoria)
+@receiver(post_delete, sender=Subcategoria)
+def subcategoria_modificada(sender, instance, raw=False, **kwargs):
+    if not raw:
+        incrementar_version_categoria(instance.categoria_id)
+        purgar(CLAVE_CATALOGO, clave_subcategoria(instance.pk))
+
+
+@receiver(post_save, sender=FotosSubcategoria)
+@receiver(post_delete, sender=FotosSubcategoria)
+def foto_modificada(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Si la foto cambió de subcategoría, la anterior también pierde una foto
+    subcategorias = {instance.subcategoria_id, getattr(instance, '_subcategoria_anterior', None)} - {None}
+    instance._subcategoria_anterior = None
+    for categoria_id in set(Subcategoria.objects.filter(pk__in=subcategorias).values_list('categoria_id', flat=True)):
+        incrementar_version_categoria(categoria_id)
+    purgar(CLAVE_CATALOGO, *map(clave_subcategoria, subcategorias))
+
+
+def eliminar_imagen_sin_referencias(nombre):
+    """
+    Borra un archivo del storage de fotos solo si ninguna FotosSubcategoria lo referencia.
+    Las fotos se deduplican por contenido, así que un mismo archivo puede estar compartido:
+    el número de filas que lo usan es su contador de referencias. Se llama tras el commit y
+    la comprobación se repite bajo el bloqueo del storage, que comparte con la reutilización
+    de archivos en las subidas (ver MediaDeduplicadaStorage.borrar_si_libre).
+    """
+    if not nombre:
+        return
+    storage = FotosSubcategoria._meta.get_field('imagen').storage
+    try:
+        storage.borrar_si_libre(nombre, lambda: FotosSubcategoria.objects.filter(imagen=nombre).exists())
+    except OSError as e:
+        logger.error("Error eliminando imagen sin referencias", extra={'imagen': nombre, 'error': str(e)})
+
+
+@receiver(pre_save, sender=FotosSubcategoria)
+def foto_recordar_imagen_anterior(sender, instance, raw=False, **kwargs):
+    if raw or not instance.pk:
+        return
+    anterior = FotosSubcategoria.objects.filter(pk=instance.pk).values_list('imagen', 'subcategoria_id').first()
+    instance._imagen_anterior, instance._subcategoria_anterior = anterior or (None, None)
+
+
+@receiver(post_save, sender=FotosSubcategoria)
+def foto_liberar_imagen_reemplazada(sender, instance, raw=False, **kwargs):
+    anterior = getattr(instance, '_imagen_anterior', None)
+    instance._imagen_anterior = None
+    if raw or not anterior or anterior == instance.imagen.name:
+        return
+    # Tras el commit: si la transacción se revierte, la fila sigue apuntando al archivo
+    transaction.on_commit(lambda: eliminar_imagen_sin_referencias(anterior))
+
+
+@receiver(post_delete, sender=FotosSubcategoria)
+def foto_liberar_imagen(sender, instance, **kwargs):
+    nombre = instance.imagen.name
+    transaction.on_commit(lambda: eliminar_imagen_sin_referencias(nombre))
@@ -13,6 +13,9 @@ const CONFIG = {
         duration: 300,
         easing: 'ease-in-out'
     },
+    serviceWorker: {
+        url: '/sw.js'
+    },
     form: {
         submitUrl: '/contacto/',
         successMessage: '¡Gracias por contactarnos! Te responderemos pronto.',
@@ -74,6 +77,16 @@ class Utils {
         requestAnimationFrame(animation);
     }
 
+    // Atributos width/height de una foto de la API: el navegador reserva el espacio antes de descargarla
+    static imageDimensions(foto) {
+        return foto.ancho && foto.alto ? `width="${foto.ancho}" height="${foto.alto}"` : '';
+    }
+
+    // Fondo con la miniatura borrosa (LQIP) y el color dominante mientras carga la foto
+    static imagePlaceholder(foto) {
+        return foto.lqip ? `background: ${foto.color_dominante} url('${foto.lqip}') center / cover no-repeat;` : '';
+    }
+
     static showToast(message, type = 'info') {
         // Crear toast usando Bootstrap
         const toastContainer = document.querySelector('.toast-container') || this.createToastContainer();
@@ -249,6 +262,30 @@ class BootstrapContactForm {
         this.setupBootstrapValidation();
         this.setupFormSubmission();
         this.setupFieldInteractions();
+        this.setupLazyCaptcha();
+    }
+
+    setupLazyCaptcha() {
+        // El HTML de la página lo cachea la CDN para todos los visitantes: cada uno pide su
+        // captcha al acercarse al formulario (o al empezar a escribir en él)
+        const cargar = () => {
+            if (this.captchaLoaded) return;
+            this.captchaLoaded = true;
+            refreshCaptcha(false);
+        };
+        this.form.addEventListener('focusin', cargar, { once: true });
+
+        if (!('IntersectionObserver' in window)) {
+            cargar();
+            return;
+        }
+        const observer = new IntersectionObserver((entries) => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                observer.disconnect();
+                cargar();
+            }
+        }, { rootMargin: '300px 0px' });
+        observer.observe(this.form);
     }
 
     setupBootstrapValidation() {
@@ -330,6 +367,8 @@ class BootstrapContactForm {
                 Utils.showToast(result.message || CONFIG.form.successMessage, 'success');
                 this.form.reset();
                 this.form.classList.remove('was-validated');
+                // El captcha usado ya no es válido: uno nuevo para el siguiente envío
+                refreshCaptcha(false);
                 this.showWhatsAppOption(formData);
             } else {
                 Utils.showToast(result.message || CONFIG.form.errorMessage, 'error');
@@ -550,7 +589,7 @@ class BootstrapFotosModal {
         
         fotoDiv.innerHTML = `
             <div class="card border-0 shadow-sm h-100 foto-item" style="cursor: pointer;">
-                <img src="${foto.imagen_url}" alt="${foto.descripcion || 'Foto de producto'}" class="card-img-top" style="height: 200px; object-fit: cover;" loading="lazy">
+                <img src="${foto.imagen_url}" alt="${foto.descripcion || 'Foto de producto'}" class="card-img-top" ${Utils.imageDimensions(foto)} style="height: 200px; object-fit: cover; ${Utils.imagePlaceholder(foto)}" loading="lazy" decoding="async">
                 ${foto.descripcion ? `
                     <div class="card-body p-2">
                         <small class="text-muted">${foto.descripcion}</small>
@@ -596,7 +635,7 @@ class BootstrapFotosModal {
                 </button>
             ` : ''}
             <div class="text-center">
-                <img src="${foto.imagen_url}" alt="${foto.descripcion || 'Foto de producto'}" class="img-fluid" style="max-height: 85vh; max-width: 90vw; cursor: pointer;" onclick="window.vmApp.fotosModal.navigateNext()">
+                <img src="${foto.imagen_url}" alt="${foto.descripcion || 'Foto de producto'}" class="img-fluid" ${Utils.imageDimensions(foto)} style="max-height: 85vh; max-width: 90vw; cursor: pointer; ${Utils.imagePlaceholder(foto)}" onclick="window.vmApp.fotosModal.navigateNext()">
                 ${foto.descripcion ? `<div class="mt-3 text-white lightbox-description rounded px-3 py-2 d-inline-block">${foto.descripcion}</div>` : ''}
                 ${this.currentFotos.length > 1 ? `<div class="mt-2 text-white lightbox-counter rounded px-2 py-1 d-inline-block small">${this.currentIndex + 1} / ${this.currentFotos.length}</div>` : ''}
             </div>
@@ -662,6 +701,15 @@ class BootstrapFotosModal {
         img.style.opacity = '0';
         
         setTimeout(() => {
+            // Reservar el tamaño y mostrar el placeholder antes de que llegue la nueva foto
+            if (foto.ancho && foto.alto) {
+                img.width = foto.ancho;
+                img.height = foto.alto;
+            } else {
+                img.removeAttribute('width');
+                img.removeAttribute('height');
+            }
+            img.style.background = foto.lqip ? `${foto.color_dominante} url('${foto.lqip}') center / cover no-repeat` : '';
             img.src = foto.imagen_url;
             img.alt = foto.descripcion || 'Foto de producto';
             
@@ -957,6 +1005,184 @@ class BootstrapWhatsAppIntegration {
     }
 }
 
+// ===== BÚSQUEDA DEL CATÁLOGO (TYPEAHEAD) =====
+class BootstrapCatalogSearch {
+    constructor() {
+        this.input = document.getElementById('catalogo-busqueda');
+        this.list = document.getElementById('catalogo-sugerencias');
+        this.results = [];
+        this.activeIndex = -1;
+        this.controller = null;
+        this.cache = new Map();
+
+        if (this.input && this.list) {
+            this.initEventListeners();
+        }
+    }
+
+    initEventListeners() {
+        this.input.addEventListener('input', Utils.debounce(() => this.search(this.input.value.trim()), 150));
+        this.input.addEventListener('keydown', (e) => this.handleKeydown(e));
+        this.input.addEventListener('focus', () => {
+            if (this.results.length) this.show();
+        });
+        document.addEventListener('click', (e) => {
+            if (!this.list.contains(e.target) && e.target !== this.input) this.hide();
+        });
+    }
+
+    async search(query) {
+        if (query.length < 2) {
+            this.render([]);
+            return;
+        }
+        if (this.cache.has(query)) {
+            this.render(this.cache.get(query));
+            return;
+        }
+
+        // Cancelar la petición anterior: solo interesa la respuesta al último texto
+        if (this.controller) this.controller.abort();
+        this.controller = new AbortController();
+
+        try {
+            const response = await fetch(`/api/buscar/?q=${encodeURIComponent(query)}`, { signal: this.controller.signal });
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            const data = await response.json();
+            const results = data.success ? data.resultados : [];
+            this.cache.set(query, results);
+            this.render(results);
+        } catch (error) {
+            if (error.name !== 'AbortError') {
+                console.error('Error buscando en el catálogo:', error);
+            }
+        }
+    }
+
+    render(results) {
+        this.results = results;
+        this.activeIndex = -1;
+        this.list.innerHTML = '';
+
+        results.forEach((result, index) => {
+            const item = document.createElement('button');
+            item.type = 'button';
+            item.className = 'list-group-item list-group-item-action d-flex align-items-center gap-2';
+            item.setAttribute('role', 'option');
+
+            if (result.imagen_url) {
+                const img = document.createElement('img');
+                img.src = result.imagen_url;
+                img.alt = '';
+                img.width = 40;
+                img.height = 40;
+                img.loading = 'lazy';
+                img.className = 'rounded';
+                img.style.objectFit = 'cover';
+                item.appendChild(img);
+            } else {
+                const icon = document.createElement('i');
+                icon.className = 'fas fa-cube text-muted';
+                item.appendChild(icon);
+            }
+
+            const text = document.createElement('span');
+            text.className = 'flex-grow-1 text-start';
+            text.textContent = result.texto;
+            item.appendChild(text);
+
+            const badge = document.createElement('small');
+            badge.className = 'text-muted';
+            badge.textContent = result.tipo === 'categoria' ? 'Categoría' : result.categoria;
+            item.appendChild(badge);
+
+            item.addEventListener('click', () => this.select(index));
+            this.list.appendChild(item);
+        });
+
+        if (results.length) {
+            this.show();
+        } else {
+            this.hide();
+        }
+    }
+
+    handleKeydown(e) {
+        if (!this.results.length) return;
+
+        if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+            e.preventDefault();
+            const step = e.key === 'ArrowDown' ? 1 : -1;
+            this.activeIndex = (this.activeIndex + step + this.results.length) % this.results.length;
+            [...this.list.children].forEach((item, index) => {
+                item.classList.toggle('active', index === this.activeIndex);
+            });
+        } else if (e.key === 'Enter') {
+            e.preventDefault();
+            this.select(this.activeIndex >= 0 ? this.activeIndex : 0);
+        } else if (e.key === 'Escape') {
+            this.hide();
+        }
+    }
+
+    select(index) {
+        const result = this.results[index];
+        if (!result) return;
+        this.hide();
+
+        if (result.subcategoria_id && window.vmApp && window.vmApp.fotosModal) {
+            window.vmApp.fotosModal.loadSubcategoriaFotos(result.subcategoria_id);
+            return;
+        }
+
+        const section = document.querySelector(`[data-category-name="${result.categoria_slug}"]`)
+            || document.querySelector('#productos');
+        if (section) {
+            Utils.smoothScrollTo(section, 800);
+        }
+    }
+
+    show() {
+        this.list.classList.remove('d-none');
+        this.input.setAttribute('aria-expanded', 'true');
+    }
+
+    hide() {
+        this.list.classList.add('d-none');
+        this.input.setAttribute('aria-expanded', 'false');
+    }
+}
+
+// ===== SERVICE WORKER (CATÁLOGO E IMÁGENES EN CACHÉ) =====
+class BootstrapServiceWorker {
+    constructor() {
+        if (!('serviceWorker' in navigator) || !window.isSecureContext) return;
+
+        this.catalogVersion = document.querySelector('meta[name="catalogo-version"]')?.content;
+        // Registrar tras la carga para no competir con los recursos de la primera visita
+        if (document.readyState === 'complete') {
+            this.register();
+        } else {
+            window.addEventListener('load', () => this.register(), { once: true });
+        }
+    }
+
+    async register() {
+        try {
+            await navigator.serviceWorker.register(CONFIG.serviceWorker.url);
+            const registration = await navigator.serviceWorker.ready;
+            // Con una versión nueva del catálogo el service worker descarta la API guardada
+            if (this.catalogVersion && registration.active) {
+                registration.active.postMessage({ tipo: 'catalogo-version', version: this.catalogVersion });
+            }
+        } catch (error) {
+            console.error('Error registrando el service worker:', error);
+        }
+    }
+}
+
 // ===== INICIALIZACIÓN BOOTSTRAP =====
 class BootstrapApp {
     constructor() {
@@ -996,6 +1222,8 @@ class BootstrapApp {
         this.components.products = new BootstrapProducts();
         this.components.backToTop = new BootstrapBackToTop();
         this.components.whatsapp = new BootstrapWhatsAppIntegration();
+        this.components.catalogSearch = new BootstrapCatalogSearch();
+        this.components.serviceWorker = new BootstrapServiceWorker();
 
         // Mantener compatibilidad con referencias directas
         this.fotosModal = this.components.fotosModal;
@@ -1258,7 +1486,7 @@ function refreshContextualCaptcha() {
 }
 
 // ===== FUNCIONES GLOBALES PARA CAPTCHA =====
-function refreshCaptcha() {
+function refreshCaptcha(focus = true) {
     fetch('/captcha/refresh/', {
         method: 'GET',
         headers: {
@@ -1281,7 +1509,7 @@ function refreshCaptcha() {
         
         if (captchaValueInput) {
             captchaValueInput.value = '';
-            captchaValueInput.focus();
+            if (focus) captchaValueInput.focus();
         }
     })
     .catch(error => {
@@ -1303,6 +1531,8 @@ window.VMModulares = {
     BootstrapProducts,
     BootstrapBackToTop,
     BootstrapWhatsAppIntegration,
+    BootstrapCatalogSearch,
+    BootstrapServiceWorker,
     CONFIG
 };
 
@@ -0,0 +1,399 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import posixpath
+import re
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, storages
+from PIL import Image as PilImage, features
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+try:
+    import fcntl
+except ImportError:  # Sin fcntl (Windows) solo protege el margen de reutilización
+    fcntl = None
+
+try:
+    import rcssmin
+except ImportError:  # Sin rcssmin se usa el minificador básico de CSS
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:  # Sin rjsmin el JS se publica sin minificar
+    rjsmin = None
+
+logger = logging.getLogger(__name__)
+
+
+def minificar_css(contenido):
+    """Elimina comentarios y espacios innecesarios de una hoja de estilos"""
+    if rcssmin is not None:
+        return rcssmin.cssmin(contenido)
+    contenido = re.sub(r'/\*.*?\*/', '', contenido, flags=re.S)
+    contenido = re.sub(r'\s+', ' ', contenido)
+    contenido = re.sub(r'\s*([{};,>])\s*', r'\1', contenido)
+    return contenido.replace(';}', '}').strip()
+
+
+def minificar_js(contenido):
+    """Minifica JavaScript con rjsmin; sin él devuelve el contenido intacto"""
+    if rjsmin is None:
+        return contenido
+    return rjsmin.jsmin(contenido)
+
+
+def _dividir_reglas(css):
+    """
+    Divide CSS minificado en bloques de primer nivel: (prelude, cuerpo).
+    El cuerpo de los @media contiene a su vez reglas anidadas.
+    """
+    bloques = []
+    profundidad = 0
+    inicio = 0
+    apertura = None
+    comilla = None
+    for i, caracter in enumerate(css):
+        if comilla:
+            if caracter == comilla and css[i - 1] != '\\':
+                comilla = None
+        elif caracter in '"\'':
+            comilla = caracter
+        elif caracter == '{':
+            if profundidad == 0:
+                apertura = i
+            profundidad += 1
+        elif caracter == '}':
+            profundidad -= 1
+            if profundidad == 0:
+                bloques.append((css[inicio:apertura].strip(), css[apertura + 1:i]))
+                inicio = i + 1
+        elif caracter == ';' and profundidad == 0:
+            # Sentencias sueltas como @charset o @import
+            bloques.append((css[inicio:i].strip(), None))
+            inicio = i + 1
+    return bloques
+
+
+def _selector_critico(selector, selectores_criticos):
+    selector = selector.strip()
+    for critico in selectores_criticos:
+        if selector == critico:
+            return True
+        # ".hero .lead" es crítico por ".hero", pero ".hero-x" no
+        if selector.startswith(critico) and not re.match(r'[\w-]', selector[len(critico)]):
+            return True
+    return False
+
+
+def extraer_css_critico(css, selectores_criticos, ruta_css=''):
+    """
+    Extrae de una hoja de estilos las reglas cuyos selectores empiezan por alguno de
+    `selectores_criticos` (los elementos visibles sin hacer scroll).
+    Las url() relativas se reescriben respecto a STATIC_URL para poder insertar
+    el resultado en un <style> dentro del HTML.
+    """
+    partes = []
+    for prelude, cuerpo in _dividir_reglas(css):
+        if cuerpo is None:
+            continue
+        if prelude.startswith('@media') or prelude.startswith('@supports'):
+            internas = extraer_css_critico(cuerpo, selectores_criticos)
+            if internas:
+                partes.append(f'{prelude}{{{internas}}}')
+        elif prelude.startswith('@font-face'):
+            partes.append(f'{prelude}{{{cuerpo}}}')
+        elif prelude.startswith('@'):
+            continue
+        elif any(_selector_critico(s, selectores_criticos) for s in prelude.split(',')):
+            partes.append(f'{prelude}{{{cuerpo}}}')
+
+    critico = ''.join(partes)
+    if ruta_css:
+        directorio = posixpath.dirname(ruta_css)
+
+        def absoluta(match):
+            url = match.group(2)
+            if re.match(r'^(data:|https?:|/|#)', url):
+                return match.group(0)
+            destino = posixpath.normpath(posixpath.join(directorio, url))
+            return f'url("{settings.STATIC_URL}{destino}")'
+
+        critico = re.sub(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)', absoluta, critico)
+    return critico
+
+
+def nombre_css_critico(ruta_css):
+    """css/home.css -> css/home.critical.css"""
+    base, extension = posixpath.splitext(ruta_css)
+    return f'{base}.critical{extension}'
+
+
+MANIFIESTO_IMAGENES = 'imagenes-responsive.json'
+EXTENSIONES_RASTER = ('.jpg', '.jpeg', '.png', '.webp')
+# Lista de estáticos (con hash) que precarga el service worker, generada por collectstatic
+MANIFIESTO_PRECACHE = 'sw-precache.json'
+
+
+def manifiesto_precache(storage):
+    """
+    URLs de SERVICE_WORKER_PRECACHE en `storage` y una versión que cambia si cambia alguna
+    (el nombre con hash cambia con el contenido)
+    """
+    archivos = [storage.url(ruta) for ruta in settings.SERVICE_WORKER_PRECACHE]
+    version = hashlib.sha256('\n'.join(archivos).encode('utf-8')).hexdigest()[:12]
+    return {'version': version, 'archivos': archivos}
+
+
+def formatos_responsive():
+    """Formatos modernos disponibles en la instalación de Pillow, del más eficiente al menos"""
+    return [formato for formato in settings.IMAGENES_RESPONSIVE_FORMATOS if features.check(formato)]
+
+
+def generar_variantes(contenido, nombre_base, anchos, formatos):
+    """
+    Genera las variantes de una imagen: un archivo por cada ancho y formato.
+    Devuelve (ancho_original, alto_original, {formato: [(ancho, nombre, bytes), ...]}).
+    Nunca se amplía la imagen: los anchos mayores que el original se sustituyen por el original.
+    """
+    with PilImage.open(io.BytesIO(contenido)) as original:
+        original.load()
+        ancho_original, alto_original = original.size
+        if original.mode not in ('RGB', 'RGBA'):
+            original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+
+        anchos = sorted({min(ancho, ancho_original) for ancho in anchos} | {ancho_original})
+        variantes = {}
+        for formato in formatos:
+            variantes[formato] = []
+            for ancho in anchos:
+                alto = round(alto_original * ancho / ancho_original)
+                imagen = original if ancho == ancho_original else original.resize(
+                    (ancho, alto), PilImage.Resampling.LANCZOS
+                )
+                buffer = io.BytesIO()
+                imagen.save(buffer, format=formato.upper(), quality=settings.IMAGENES_RESPONSIVE_CALIDAD[formato])
+                variantes[formato].append((ancho, f'{nombre_base}.w{ancho}.{formato}', buffer.getvalue()))
+    return ancho_original, alto_original, variantes
+
+
+class EstaticosOptimizadosStorage(CompressedManifestStaticFilesStorage):
+    """
+    Storage de collectstatic que, además del hash en el nombre y la compresión gzip/brotli
+    de WhiteNoise, minifica CSS/JS y genera el CSS crítico configurado en CSS_CRITICO.
+    La minificación se aplica a los archivos ya procesados por el manifest (URLs con hash)
+    y antes de comprimirlos.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            self._generar_imagenes_responsive(paths)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if not dry_run:
+            # Con todos los nombres con hash ya calculados
+            self._guardar_manifiesto_precache()
+
+    def post_process_with_compression(self, files):
+        return super().post_process_with_compression(self._minificar(files))
+
+    def _minificar(self, files):
+        for name, hashed_name, processed in files:
+            if processed and not isinstance(processed, Exception):
+                extension = posixpath.splitext(name)[1].lower()
+                if extension in ('.css', '.js'):
+                    for ruta in {name, hashed_name}:
+                        self._minificar_archivo(ruta, extension)
+                    if name in settings.CSS_CRITICO:
+                        self._guardar_css_critico(name, hashed_name)
+            yield name, hashed_name, processed
+
+    def _minificar_archivo(self, ruta, extension):
+        if not self.exists(ruta):
+            return
+        with self.open(ruta) as archivo:
+            contenido = archivo.read().decode('utf-8')
+        minificado = minificar_css(contenido) if extension == '.css' else minificar_js(contenido)
+        if minificado != contenido:
+            self.delete(ruta)
+            self._save(ruta, ContentFile(minificado.encode('utf-8')))
+
+    def _guardar_css_critico(self, name, hashed_name):
+        # El CSS con hash ya tiene las url() apuntando a las imágenes con hash
+        with self.open(hashed_name) as archivo:
+            contenido = archivo.read().decode('utf-8')
+        critico = extraer_css_critico(contenido, settings.CSS_CRITICO[name], name)
+        ruta_critico = nombre_css_critico(name)
+        if self.exists(ruta_critico):
+            self.delete(ruta_critico)
+        self._save(ruta_critico, ContentFile(critico.encode('utf-8')))
+
+    def _guardar_manifiesto_precache(self):
+        contenido = json.dumps(manifiesto_precache(self), indent=2).encode('utf-8')
+        if self.exists(MANIFIESTO_PRECACHE):
+            self.delete(MANIFIESTO_PRECACHE)
+        self._save(MANIFIESTO_PRECACHE, ContentFile(contenido))
+
+    def _generar_imagenes_responsive(self, paths):
+        """
+        Crea las variantes WebP/AVIF en varios anchos de cada imagen raster y las registra en
+        MANIFIESTO_IMAGENES. El nombre de cada variante incluye el hash del contenido original,
+        así que una imagen sin cambios se salta y sus variantes se pueden cachear sin límite.
+        """
+        manifiesto = {}
+        if self.exists(MANIFIESTO_IMAGENES):
+            with self.open(MANIFIESTO_IMAGENES) as archivo:
+                manifiesto = json.loads(archivo.read().decode('utf-8'))
+
+        formatos = formatos_responsive()
+        pendientes = []
+        for ruta, (storage, ruta_origen) in paths.items():
+            if not ruta.lower().endswith(EXTENSIONES_RASTER):
+                continue
+            with storage.open(ruta_origen) as archivo:
+                contenido = archivo.read()
+            huella = hashlib.sha256(contenido).hexdigest()[:12]
+            anterior = manifiesto.get(ruta)
+            if (
+                anterior
+                and anterior['hash'] == huella
+                and sorted(anterior['variantes']) == sorted(formatos)
+                and all(self.exists(nombre) for lista in anterior['variantes'].values() for _, nombre in lista)
+            ):
+                continue
+            base = posixpath.splitext(ruta)[0]
+            pendientes.append((ruta, huella, contenido, f'{base}.{huella}'))
+
+        def procesar(pendiente):
+            ruta, huella, contenido, nombre_base = pendiente
+            try:
+                return ruta, huella, generar_variantes(
+                    contenido, nombre_base, settings.IMAGENES_RESPONSIVE_ANCHOS, formatos
+                )
+            except (OSError, ValueError) as e:
+                logger.warning("No se generaron variantes responsive", extra={'imagen': ruta, 'error': str(e)})
+                return ruta, huella, None
+
+        generadas = 0
+        with ThreadPoolExecutor() as executor:
+            for ruta, huella, resultado in executor.map(procesar, pendientes):
+                if resultado is None:
+                    continue
+                ancho, alto, variantes = resultado
+                generadas += 1
+                for lista in variantes.values():
+                    for _, nombre, datos in lista:
+                        if not self.exists(nombre):
+                            self._save(nombre, ContentFile(datos))
+                manifiesto[ruta] = {
+                    'hash': huella,
+                    'ancho': ancho,
+                    'alto': alto,
+                    'variantes': {
+                        formato: [[ancho_variante, nombre] for ancho_variante, nombre, _ in lista]
+                        for formato, lista in variantes.items()
+                    },
+                }
+
+        # Olvidar las imágenes que ya no existen en el origen
+        manifiesto = {ruta: datos for ruta, datos in manifiesto.items() if ruta in paths}
+        if self.exists(MANIFIESTO_IMAGENES):
+            self.delete(MANIFIESTO_IMAGENES)
+        self._save(MANIFIESTO_IMAGENES, ContentFile(json.dumps(manifiesto, indent=2).encode('utf-8')))
+        logger.info("Imágenes responsive actualizadas", extra={'generadas': generadas, 'sin_cambios': len(manifiesto) - generadas})
+
+
+class MediaDeduplicadaStorage(FileSystemStorage):
+    """
+    Storage direccionado por contenido para las fotos del catálogo.
+    El nombre de cada archivo es el SHA-256 de sus bytes (ya procesados), así una misma imagen
+    subida varias veces se guarda una sola vez y todas las filas apuntan a la misma URL.
+    Los archivos compartidos solo se borran cuando ninguna fila los referencia
+    (ver webpage.signals).
+
+    Reutilizar un archivo y borrarlo se hacen bajo un mismo bloqueo de archivo (compartido
+    entre workers) y la reutilización renueva su mtime: borrar_si_libre() no borra un archivo
+    reutilizado hace menos de `margen_reutilizacion` segundos, porque la fila de esa subida
+    puede no estar confirmada todavía. Esos archivos, si quedan huérfanos, los recoge
+    auditar_media --borrar-huerfanos.
+    """
+
+    def __init__(self, prefijo='fotos', margen_reutilizacion=600, **kwargs):
+        self.prefijo = prefijo
+        self.margen_reutilizacion = margen_reutilizacion
+        super().__init__(**kwargs)
+
+    @contextmanager
+    def bloqueo(self):
+        """Bloqueo exclusivo entre procesos sobre MEDIA_ROOT/.<prefijo>.lock"""
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.location, exist_ok=True)
+        with open(os.path.join(self.location, f'.{self.prefijo}.lock'), 'a') as archivo:
+            fcntl.flock(archivo, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(archivo, fcntl.LOCK_UN)
+
+    def nombre_para(self, content, name=''):
+        """Devuelve el nombre direccionado por contenido de `content`"""
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        huella = digest.hexdigest()
+        extension = posixpath.splitext(name)[1].lower()
+        return f'{self.prefijo}/{huella[:2]}/{huella}{extension}'
+
+    def es_direccionado(self, name):
+        """True si `name` ya es un nombre generado por este storage (hash del contenido)"""
+        return re.fullmatch(rf'{re.escape(self.prefijo)}/[0-9a-f]{{2}}/[0-9a-f]{{64}}\.\w+', name or '') is not None
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = ContentFile(content, name)
+
+        nombre = self.nombre_para(content, name)
+        with self.bloqueo():
+            if self.exists(nombre):
+                # Mismo contenido ya almacenado: reutilizar el archivo existente, marcándolo
+                # como recién usado para que un borrado concurrente no lo elimine
+                os.utime(self.path(nombre))
+                return nombre
+            return super().save(nombre, content, max_length=max_length)
+
+    def borrar_si_libre(self, nombre, en_uso):
+        """
+        Borra `nombre` si en_uso() devuelve False, comprobándolo bajo el bloqueo. Los archivos
+        direccionados por contenido reutilizados hace menos de margen_reutilizacion segundos
+        se conservan. Devuelve True si se borró.
+        """
+        with self.bloqueo():
+            if self.es_direccionado(nombre):
+                try:
+                    mtime = os.stat(self.path(nombre)).st_mtime
+                except FileNotFoundError:
+                    return False
+                if time.time() - mtime < self.margen_reutilizacion:
+                    return False
+            if en_uso():
+                return False
+            self.delete(nombre)
+            return True
+
+
+def storage_fotos():
+    """Storage del campo FotosSubcategoria.imagen (alias 'fotos' de STORAGES)"""
+    return storages['fotos']
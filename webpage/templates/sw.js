@@ -0,0 +1,117 @@
+/**
+ * VM Modulares - Service worker (lo sirve la vista webpage.views.service_worker en /sw.js)
+ * - Precache de home.css, home.js y el logo: lista con hash generada por collectstatic.
+ * - API de fotos: stale-while-revalidate; la caché se vacía cuando cambia la versión del catálogo.
+ * - Fotos procesadas de /media/: cache-first (el nombre es el hash del contenido, nunca cambian).
+ */
+const PRECACHE_VERSION = '{{ version }}';
+const PRECACHE_ARCHIVOS = {{ archivos|safe }};
+const MEDIA_MAX = {{ media_max }};
+const API_REVALIDAR_MS = {{ api_revalidar_ms }};
+
+const PRECACHE = `vm-precache-${PRECACHE_VERSION}`;
+const MEDIA = 'vm-media';
+const API_PREFIJO = 'vm-api-';
+const API_FOTOS = /^\/api\/subcategoria\/\d+\/fotos\/$/;
+const CABECERA_FECHA = 'X-SW-Fecha';
+
+// Caché de la API de la versión del catálogo vigente ('vm-api-<versión>'); la anuncia la página
+let apiCache = null;
+
+self.addEventListener('install', (event) => {
+    event.waitUntil(
+        caches.open(PRECACHE)
+            .then(cache => cache.addAll(PRECACHE_ARCHIVOS))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', (event) => {
+    // Los precaches de despliegues anteriores ya no se usan
+    event.waitUntil(
+        caches.keys()
+            .then(nombres => Promise.all(
+                nombres.filter(n => n.startsWith('vm-precache-') && n !== PRECACHE).map(n => caches.delete(n))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('message', (event) => {
+    const datos = event.data || {};
+    if (datos.tipo === 'catalogo-version' && datos.version) {
+        event.waitUntil(usarVersionCatalogo(String(datos.version)));
+    }
+});
+
+async function usarVersionCatalogo(version) {
+    const nombre = API_PREFIJO + version;
+    if (apiCache === nombre) return;
+    apiCache = nombre;
+    // El catálogo cambió: las respuestas guardadas de la API ya no sirven
+    const nombres = await caches.keys();
+    await Promise.all(nombres.filter(n => n.startsWith(API_PREFIJO) && n !== nombre).map(n => caches.delete(n)));
+}
+
+async function nombreApiCache() {
+    if (apiCache) return apiCache;
+    // El service worker se reinicia a menudo: recuperar la versión por el nombre de la caché
+    const nombres = await caches.keys();
+    apiCache = nombres.find(n => n.startsWith(API_PREFIJO)) || API_PREFIJO + '0';
+    return apiCache;
+}
+
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) return;
+
+    if (API_FOTOS.test(url.pathname)) {
+        event.respondWith(staleWhileRevalidate(event, request));
+    } else if (url.pathname.startsWith('{{ media_fotos }}')) {
+        event.respondWith(cacheFirst(request));
+    } else if (PRECACHE_ARCHIVOS.includes(url.pathname)) {
+        event.respondWith(caches.match(request, { cacheName: PRECACHE }).then(r => r || fetch(request)));
+    }
+});
+
+async function staleWhileRevalidate(event, request) {
+    const cache = await caches.open(await nombreApiCache());
+    const guardada = await cache.match(request);
+    const actualizar = () => fetch(request).then(async (response) => {
+        if (response.ok) {
+            // Guardar con la fecha para no revalidar en cada apertura del modal
+            const cuerpo = await response.clone().blob();
+            const cabeceras = new Headers(response.headers);
+            cabeceras.set(CABECERA_FECHA, String(Date.now()));
+            await cache.put(request, new Response(cuerpo, { status: response.status, headers: cabeceras }));
+        }
+        return response;
+    });
+
+    if (!guardada) return actualizar();
+    const fecha = Number(guardada.headers.get(CABECERA_FECHA)) || 0;
+    if (Date.now() - fecha > API_REVALIDAR_MS) {
+        event.waitUntil(actualizar().catch(() => {}));
+    }
+    return guardada;
+}
+
+async function cacheFirst(request) {
+    const cache = await caches.open(MEDIA);
+    const guardada = await cache.match(request);
+    if (guardada) return guardada;
+    const response = await fetch(request);
+    if (response.ok) {
+        await cache.put(request, response.clone());
+        recortarMedia(cache);
+    }
+    return response;
+}
+
+async function recortarMedia(cache) {
+    // keys() devuelve las entradas en orden de inserción: se descartan las más antiguas
+    const claves = await cache.keys();
+    await Promise.all(claves.slice(0, Math.max(claves.length - MEDIA_MAX, 0)).map(r => cache.delete(r)));
+}
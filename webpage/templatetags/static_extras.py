@@ -0,0 +1,146 @@
+import json
+import logging
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+from webpage.storage import MANIFIESTO_IMAGENES, extraer_css_critico, minificar_css, nombre_css_critico
+
+logger = logging.getLogger(__name__)
+
+register = template.Library()
+
+_css_critico_cache = {}
+_manifiesto_imagenes = None
+
+
+def obtener_css_critico(ruta_css):
+    """
+    Devuelve el CSS crítico de una hoja de estilos.
+    Usa el archivo generado por collectstatic y, si no existe (desarrollo), lo calcula
+    a partir del archivo original. El resultado se guarda en memoria del proceso.
+    """
+    if ruta_css in _css_critico_cache:
+        return _css_critico_cache[ruta_css]
+
+    critico = ''
+    ruta_critico = nombre_css_critico(ruta_css)
+    try:
+        if staticfiles_storage.exists(ruta_critico):
+            with staticfiles_storage.open(ruta_critico) as archivo:
+                critico = archivo.read().decode('utf-8')
+        else:
+            origen = finders.find(ruta_css)
+            if origen:
+                with open(origen, encoding='utf-8') as archivo:
+                    critico = extraer_css_critico(
+                        minificar_css(archivo.read()), settings.CSS_CRITICO[ruta_css], ruta_css
+                    )
+    except (OSError, NotImplementedError) as e:
+        logger.warning("Error obteniendo CSS crítico", extra={'css': ruta_css, 'error': str(e)})
+
+    # En desarrollo se recalcula en cada petición para reflejar cambios en el CSS
+    if not settings.DEBUG:
+        _css_critico_cache[ruta_css] = critico
+    return critico
+
+
+@register.simple_tag
+def css_diferido(ruta_css):
+    """
+    Inserta el CSS crítico de `ruta_css` en un <style> y carga la hoja completa sin bloquear
+    el renderizado. Si la hoja no tiene CSS crítico configurado (CSS_CRITICO) o
+    CSS_CRITICO_ACTIVO es False, genera un <link rel="stylesheet"> normal.
+    Uso en template: {% css_diferido 'css/home.css' %}
+    """
+    url = static(ruta_css)
+    if not settings.CSS_CRITICO_ACTIVO or ruta_css not in settings.CSS_CRITICO:
+        return format_html('<link rel="stylesheet" href="{}">', url)
+
+    critico = obtener_css_critico(ruta_css)
+    estilo = mark_safe(f'<style>{critico}</style>') if critico else ''
+    return format_html(
+        '{}<link rel="preload" href="{}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+        '<noscript><link rel="stylesheet" href="{}"></noscript>',
+        estilo, url, url,
+    )
+
+
+def obtener_variantes(ruta):
+    """
+    Devuelve la entrada de MANIFIESTO_IMAGENES para `ruta` o None si no hay variantes
+    (por ejemplo en desarrollo, donde no se ejecuta collectstatic).
+    """
+    global _manifiesto_imagenes
+    if _manifiesto_imagenes is None or settings.DEBUG:
+        manifiesto = {}
+        try:
+            if staticfiles_storage.exists(MANIFIESTO_IMAGENES):
+                with staticfiles_storage.open(MANIFIESTO_IMAGENES) as archivo:
+                    manifiesto = json.loads(archivo.read().decode('utf-8'))
+        except (OSError, ValueError, NotImplementedError) as e:
+            logger.warning("Error leyendo el manifiesto de imágenes", extra={'manifiesto': MANIFIESTO_IMAGENES, 'error': str(e)})
+        _manifiesto_imagenes = manifiesto
+    return _manifiesto_imagenes.get(ruta)
+
+
+def _srcset(lista):
+    return ', '.join(f'{settings.STATIC_URL}{nombre} {ancho}w' for ancho, nombre in lista)
+
+
+@register.simple_tag
+def responsive_static(ruta, alt='', sizes='100vw', clase='', lcp=False):
+    """
+    Genera un <picture> con las variantes AVIF/WebP de una imagen estática y la imagen
+    original como respaldo. Con lcp=True la imagen se pide con prioridad alta y sin lazy loading.
+    Uso en template: {% responsive_static 'images/hero-bg.jpg' alt='...' sizes='100vw' lcp=True %}
+    """
+    datos = obtener_variantes(ruta)
+    carga = mark_safe('fetchpriority="high" decoding="async"' if lcp else 'loading="lazy" decoding="async"')
+    if not datos:
+        return format_html('<img src="{}" alt="{}" class="{}" {}>', static(ruta), alt, clase, carga)
+
+    fuentes = format_html_join(
+        '', '<source type="image/{}" srcset="{}" sizes="{}">',
+        ((formato, _srcset(lista), sizes) for formato, lista in datos['variantes'].items())
+    )
+    return format_html(
+        '<picture>{}<img src="{}" alt="{}" class="{}" width="{}" height="{}" {}></picture>',
+        fuentes, static(ruta), alt, clase, datos['ancho'], datos['alto'], carga,
+    )
+
+
+def datos_preload(ruta, sizes='100vw'):
+    """
+    Atributos del preload de una imagen responsive: el primer formato del <picture> (el que
+    elegirá el navegador si lo soporta). Sin variantes, solo href con la imagen original.
+    """
+    datos = obtener_variantes(ruta)
+    if not datos or not datos['variantes']:
+        return {'href': static(ruta)}
+    formato, lista = next(iter(datos['variantes'].items()))
+    return {
+        # Los navegadores con imagesrcset ignoran href: la variante más grande como respaldo
+        'href': f'{settings.STATIC_URL}{lista[-1][1]}',
+        'type': f'image/{formato}',
+        'imagesrcset': _srcset(lista),
+        'imagesizes': sizes,
+    }
+
+
+@register.simple_tag
+def responsive_preload(ruta, sizes='100vw'):
+    """
+    Genera el <link rel="preload"> de la imagen candidata a LCP para el <head>.
+    Uso en template: {% responsive_preload 'images/hero-bg.jpg' %}
+    """
+    datos = datos_preload(ruta, sizes)
+    if 'imagesrcset' not in datos:
+        return format_html('<link rel="preload" as="image" href="{}" fetchpriority="high">', datos['href'])
+    return format_html(
+        '<link rel="preload" as="image" type="{}" imagesrcset="{}" imagesizes="{}" fetchpriority="high">',
+        datos['type'], datos['imagesrcset'], datos['imagesizes'],
+    )
@@ -1,3 +1,261 @@
-from django.test import TestCase
+import datetime
+import io
+import os
+import sqlite3
+import tempfile
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from .cache import CacheSQLite
+from .cdn import PurgaCDN, _envio_pendiente, obtener_backend, purgar
+from .models import Categoria, Contacto, ContactoArchivado, FotosSubcategoria, Subcategoria
+from .retencion import archivar_contactos, restaurar_contactos
 
-# Create your tests here.
+
+class CacheSQLiteTests(SimpleTestCase):
+    """Backend de caché compartida (webpage.cache): totales mantenidos por triggers y desalojo"""
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.ruta = os.path.join(directorio.name, 'cache.sqlite3')
+        self.cache = CacheSQLite(self.ruta, {'OPTIONS': {'MAX_ENTRIES': 100}})
+        self.addCleanup(lambda: self.cache._conexion().close())
+
+    def totales(self):
+        conexion = self.cache._conexion()
+        return {
+            'tabla': conexion.execute("SELECT entradas, bytes FROM cache_totales").fetchone(),
+            'real': conexion.execute("SELECT COUNT(*), COALESCE(SUM(tamano), 0) FROM cache").fetchone(),
+        }
+
+    def test_sobrescribir_una_clave_no_desvia_los_totales(self):
+        for i in range(50):
+            self.cache.set('clave', 'x' * i)
+        totales = self.totales()
+        self.assertEqual(totales['tabla'], totales['real'])
+        self.assertEqual(totales['tabla'][0], 1)
+
+    def test_set_many_con_claves_existentes_no_desvia_los_totales(self):
+        for _ in range(5):
+            self.cache.set_many({f'clave-{i}': i for i in range(20)})
+        self.cache.set_many({f'clave-{i}': 'texto' for i in range(10, 30)})
+        totales = self.totales()
+        self.assertEqual(totales['tabla'], totales['real'])
+        self.assertEqual(totales['tabla'][0], 30)
+
+    def test_sobrescrituras_no_vacian_la_cache(self):
+        for i in range(500):
+            self.cache.set('contador', i)
+        for i in range(10):
+            self.cache.set(f'clave-{i}', i)
+        self.assertEqual(self.cache.get_many([f'clave-{i}' for i in range(10)]),
+                         {f'clave-{i}': i for i in range(10)})
+        self.assertEqual(self.cache.get('contador'), 499)
+
+    def test_desalojo_respeta_max_entries(self):
+        for i in range(150):
+            self.cache.set(f'clave-{i}', i)
+        totales = self.totales()
+        self.assertEqual(totales['tabla'], totales['real'])
+        self.assertLessEqual(totales['real'][0], 100)
+        self.assertEqual(self.cache.get('clave-149'), 149)
+
+    def test_totales_desviados_se_recalculan_al_abrir(self):
+        self.cache.set('clave', 'valor')
+        self.cache._conexion().close()
+        with sqlite3.connect(self.ruta) as conexion:
+            # Archivo creado por una versión anterior con los totales desviados
+            conexion.execute("UPDATE cache_totales SET entradas = 500, bytes = 10")
+            conexion.execute("PRAGMA user_version = 0")
+        self.cache = cache = CacheSQLite(self.ruta, {'OPTIONS': {'MAX_ENTRIES': 100}})
+        totales = self.totales()
+        self.assertEqual(totales['tabla'], totales['real'])
+        self.assertEqual(cache.get('clave'), 'valor')
+
+    def test_incr_y_add(self):
+        self.assertTrue(self.cache.add('version', 1))
+        self.assertFalse(self.cache.add('version', 5))
+        self.assertEqual(self.cache.incr('version'), 2)
+        self.assertEqual(self.cache.get('version'), 2)
+        totales = self.totales()
+        self.assertEqual(totales['tabla'], totales['real'])
+
+
+def _jpeg(color='red'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), color).save(buffer, format='JPEG')
+    return SimpleUploadedFile('foto.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+
+class PurgaMemoria(PurgaCDN):
+    """Doble de pruebas del backend de purga: guarda cada purga (lista de claves) en self.purgas"""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.purgas = []
+
+    def purgar(self, claves):
+        self.purgas.append(list(claves))
+
+
+@override_settings(CDN={'BACKEND': 'webpage.tests.PurgaMemoria'})
+class PurgaCDNAdminTests(TestCase):
+    """Cada edición del admin purga exactamente las claves Surrogate-Key afectadas (webpage.cdn)"""
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=directorio.name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.categoria = Categoria.objects.create(nombre='Hogar')
+            self.cocinas = Subcategoria.objects.create(categoria=self.categoria, nombre='Cocinas')
+            self.closets = Subcategoria.objects.create(categoria=self.categoria, nombre='Closets')
+            self.foto = FotosSubcategoria(subcategoria=self.cocinas, imagen=_jpeg())
+            self.foto.save()
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'clave'))
+        self.backend = obtener_backend()
+        self.backend.purgas.clear()
+
+    def purgas(self, metodo, url, datos=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = metodo(url, datos or {})
+        self.assertEqual(response.status_code, 302)
+        return self.backend.purgas
+
+    def datos_foto(self, **cambios):
+        return {'subcategoria': self.cocinas.pk, 'descripcion': 'Cocina integral', 'orden': 0, **cambios}
+
+    def test_editar_foto(self):
+        purgas = self.purgas(self.client.post, f'/admin/webpage/fotossubcategoria/{self.foto.pk}/change/',
+                             self.datos_foto())
+        self.assertEqual(purgas, [['catalogo', f'subcategoria-{self.cocinas.pk}']])
+
+    def test_mover_foto_de_subcategoria(self):
+        purgas = self.purgas(self.client.post, f'/admin/webpage/fotossubcategoria/{self.foto.pk}/change/',
+                             self.datos_foto(subcategoria=self.closets.pk))
+        self.assertEqual(len(purgas), 1)
+        self.assertEqual(set(purgas[0]), {
+            'catalogo', f'subcategoria-{self.cocinas.pk}', f'subcategoria-{self.closets.pk}',
+        })
+
+    def test_renombrar_categoria(self):
+        purgas = self.purgas(self.client.post, f'/admin/webpage/categoria/{self.categoria.pk}/change/',
+                             {'nombre': 'Hogar y cocina'})
+        self.assertEqual(purgas, [['catalogo', f'categoria-{self.categoria.pk}']])
+
+    def test_eliminar_subcategoria(self):
+        purgas = self.purgas(self.client.post, f'/admin/webpage/subcategoria/{self.cocinas.pk}/delete/',
+                             {'post': 'yes'})
+        self.assertEqual(purgas, [['catalogo', f'subcategoria-{self.cocinas.pk}']])
+
+    def test_sin_commit_no_hay_purga(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.client.post(f'/admin/webpage/fotossubcategoria/{self.foto.pk}/change/', self.datos_foto())
+        self.assertTrue(callbacks)
+        self.assertEqual(self.backend.purgas, [])
+
+    def test_transaccion_revertida_descarta_sus_claves(self):
+        with self.assertRaises(ValueError), transaction.atomic():
+            purgar(f'subcategoria-{self.closets.pk}')
+            raise ValueError
+        with self.captureOnCommitCallbacks(execute=True):
+            purgar('catalogo')
+        self.assertEqual(self.backend.purgas, [['catalogo']])
+
+    def test_varias_purgas_de_una_transaccion_van_en_un_envio(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                purgar('catalogo')
+                purgar(f'subcategoria-{self.cocinas.pk}')
+                purgar('catalogo', f'categoria-{self.categoria.pk}')
+        self.assertEqual(self.backend.purgas, [
+            ['catalogo', f'categoria-{self.categoria.pk}', f'subcategoria-{self.cocinas.pk}'],
+        ])
+
+    def test_forma_de_run_on_commit(self):
+        # _envio_pendiente() inspecciona la lista interna de Django: si su forma cambia, falla aquí
+        def hook():
+            pass
+
+        with self.captureOnCommitCallbacks():
+            self.assertFalse(_envio_pendiente(connection, hook))
+            transaction.on_commit(hook)
+            self.assertTrue(_envio_pendiente(connection, hook))
+
+    def test_deduplicar_media(self):
+        # Foto anterior al storage direccionado por contenido: nombre original, sin hash
+        storage = FotosSubcategoria._meta.get_field('imagen').storage
+        with storage.open(self.foto.imagen.name) as archivo:
+            original = storage.path('hogar/cocina.webp')
+            os.makedirs(os.path.dirname(original))
+            with open(original, 'wb') as destino:
+                destino.write(archivo.read())
+        FotosSubcategoria.objects.filter(pk=self.foto.pk).update(imagen='hogar/cocina.webp')
+        version = Categoria.objects.get(pk=self.categoria.pk).version
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('deduplicar_media', stdout=io.StringIO())
+
+        self.assertEqual(self.backend.purgas, [['catalogo', f'subcategoria-{self.cocinas.pk}']])
+        self.assertEqual(Categoria.objects.get(pk=self.categoria.pk).version, version + 1)
+        self.assertEqual(FotosSubcategoria.objects.get(pk=self.foto.pk).imagen.name, self.foto.imagen.name)
+        self.assertFalse(os.path.exists(original))
+
+
+class RetencionContactosTests(TestCase):
+    """Archivo de contactos antiguos (webpage.retencion): los ids y fechas originales se conservan"""
+
+    def setUp(self):
+        ahora = timezone.now()
+        self.fechas = {}
+        for dias in (800, 700, 600, 500, 400, 10):
+            contacto = Contacto.objects.create(nombre=f'Contacto {dias}', email=f'c{dias}@example.com',
+                                               mensaje='Hola')
+            # auto_now_add fija la fecha actual al crear
+            fecha = ahora - datetime.timedelta(days=dias)
+            Contacto.objects.filter(pk=contacto.pk).update(fecha_contacto=fecha)
+            self.fechas[contacto.pk] = fecha
+        self.recientes = {pk for pk, fecha in self.fechas.items() if fecha > ahora - datetime.timedelta(days=365)}
+
+    def assertFechas(self, modelo, ids):
+        self.assertEqual(dict(modelo.objects.values_list('id', 'fecha_contacto')),
+                         {pk: self.fechas[pk] for pk in ids})
+
+    def test_archivar_y_restaurar_conserva_id_y_fecha(self):
+        antiguos = set(self.fechas) - self.recientes
+        self.assertEqual(archivar_contactos(dias=365, lote=2), len(antiguos))
+        self.assertFechas(ContactoArchivado, antiguos)
+        self.assertFechas(Contacto, self.recientes)
+
+        self.assertEqual(restaurar_contactos(ContactoArchivado.objects.all(), lote=2), len(antiguos))
+        self.assertFechas(Contacto, self.fechas)
+        self.assertFalse(ContactoArchivado.objects.exists())
+
+    def test_restaurar_solo_la_seleccion(self):
+        archivar_contactos(dias=365)
+        seleccion = sorted(set(self.fechas) - self.recientes)[:3]
+        restaurar_contactos(ContactoArchivado.objects.filter(pk__in=seleccion), lote=2)
+        self.assertFechas(Contacto, self.recientes | set(seleccion))
+        self.assertFechas(ContactoArchivado, set(self.fechas) - self.recientes - set(seleccion))
+
+    def test_volver_a_archivar_reemplaza_la_copia_archivada(self):
+        archivar_contactos(dias=365)
+        restaurar_contactos(ContactoArchivado.objects.all())
+        pk = min(self.fechas)
+        Contacto.objects.filter(pk=pk).update(email_enviado=True)
+        # Copia antigua del mismo id que quedó en el archivo
+        ContactoArchivado.objects.create(id=pk, nombre='Copia antigua', email='viejo@example.com',
+                                         mensaje='Viejo', fecha_contacto=timezone.now())
+
+        archivar_contactos(dias=365)
+        archivado = ContactoArchivado.objects.get(pk=pk)
+        self.assertEqual((archivado.nombre, archivado.email_enviado), ('Contacto 800', True))
+        self.assertFechas(ContactoArchivado, set(self.fechas) - self.recientes)
+        self.assertFalse(Contacto.objects.filter(pk=pk).exists())
@@ -8,6 +8,9 @@ urlpatterns = [
     path('contacto/', views.contacto, name='contacto'),
     # API URLs
     path('api/subcategoria/<int:subcategoria_id>/fotos/', views.get_subcategoria_fotos, name='subcategoria_fotos'),
+    path('api/buscar/', views.buscar_catalogo, name='buscar_catalogo'),
+    # Service worker en la raíz: su alcance es todo el sitio
+    path('sw.js', views.service_worker, name='service_worker'),
     # SEO URLs
     path('robots.txt', views.robots_txt, name='robots_txt'),
 ]
\ No newline at end of file
@@ -1,15 +1,24 @@
+import logging
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.contrib.staticfiles.storage import staticfiles_storage
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.mail import send_mail
 from django.conf import settings
+from django.db.models import OuterRef, Subquery
+from django.utils.functional import SimpleLazyObject
 from .models import Categoria, Subcategoria, FotosSubcategoria, Contacto
+from . import catalogo_busqueda as indice_catalogo
+from .storage import MANIFIESTO_PRECACHE, manifiesto_precache
+from .cdn import CLAVE_CATALOGO, agregar_claves, cache_publico, clave_categoria, clave_subcategoria
 from captcha.models import CaptchaStore
-from captcha.helpers import captcha_image_url
 from captcha.fields import CaptchaField
 import json
 
+logger = logging.getLogger(__name__)
+
 
 # Create your views here.
 
@@ -36,8 +45,61 @@ def robots_txt(request):
     return HttpResponse('\n'.join(lines), content_type="text/plain")
 
 
+_precache = None
+
+
+def obtener_precache():
+    """Manifiesto de precache generado por collectstatic; en desarrollo, las URLs actuales"""
+    global _precache
+    if settings.DEBUG:
+        return manifiesto_precache(staticfiles_storage)
+    if _precache is None:
+        try:
+            with staticfiles_storage.open(MANIFIESTO_PRECACHE) as archivo:
+                _precache = json.loads(archivo.read().decode('utf-8'))
+        except (OSError, ValueError) as e:
+            logger.warning("Error leyendo el manifiesto de precache", extra={'manifiesto': MANIFIESTO_PRECACHE, 'error': str(e)})
+            _precache = manifiesto_precache(staticfiles_storage)
+    return _precache
+
+
+def service_worker(request):
+    """Service worker servido desde la raíz del sitio para que su alcance sea '/'"""
+    precache = obtener_precache()
+    contenido = render_to_string('sw.js', {
+        'version': precache['version'],
+        'archivos': json.dumps(precache['archivos']),
+        # Solo las fotos con nombre por contenido: una URL nunca cambia de imagen
+        'media_fotos': f"{settings.MEDIA_URL}{settings.STORAGES['fotos']['OPTIONS']['prefijo']}/",
+        'media_max': settings.SERVICE_WORKER_MEDIA_MAX,
+        'api_revalidar_ms': settings.SERVICE_WORKER_API_REVALIDAR * 1000,
+    })
+    response = HttpResponse(contenido, content_type='application/javascript; charset=utf-8')
+    # El navegador debe comprobar siempre si hay una versión nueva
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def obtener_fotos_destacadas():
+    """Devuelve {subcategoria_id: primera foto} en dos consultas en lugar de una por subcategoría"""
+    primera_foto = FotosSubcategoria.objects.filter(
+        subcategoria=OuterRef('pk')
+    ).order_by('orden', 'fecha_subida').values('pk')[:1]
+    foto_ids = Subcategoria.objects.annotate(
+        foto_id=Subquery(primera_foto)
+    ).filter(foto_id__isnull=False).values_list('foto_id', flat=True)
+    return {
+        foto.subcategoria_id: foto
+        for foto in FotosSubcategoria.objects.filter(pk__in=list(foto_ids))
+    }
+
+
+@cache_publico(claves=[CLAVE_CATALOGO])
 def home(request):
-    """Vista principal de la landing page"""
+    """
+    Vista principal de la landing page. Es igual para todos los visitantes (la CDN la cachea):
+    el captcha del formulario lo pide home.js a /captcha/refresh/ al acercarse al formulario.
+    """
     # Obtener categorías con sus subcategorías
     categorias = Categoria.objects.prefetch_related('subcategoria_set').all()
     
@@ -45,27 +107,18 @@ def home(request):
     hogar_categoria = categorias.filter(nombre__iexact='HOGAR').first()
     empresa_categoria = categorias.filter(nombre__iexact='EMPRESA').first()
     
-    # Obtener fotos destacadas para cada subcategoría
-    fotos_destacadas = {}
-    for categoria in categorias:
-        for subcategoria in categoria.subcategoria_set.all():
-            foto = FotosSubcategoria.objects.filter(
-                subcategoria=subcategoria
-            ).order_by('orden', 'fecha_subida').first()
-            if foto:
-                fotos_destacadas[subcategoria.id] = foto
-    
-    # Generar nuevo captcha para el formulario
-    captcha_key = CaptchaStore.generate_key()
-    captcha_image = captcha_image_url(captcha_key)
+    # Las fotos destacadas solo se consultan si algún fragmento del catálogo no está en caché
+    fotos_destacadas = SimpleLazyObject(obtener_fotos_destacadas)
     
     context = {
         'categorias': categorias,
         'hogar_categoria': hogar_categoria,
         'empresa_categoria': empresa_categoria,
         'fotos_destacadas': fotos_destacadas,
-        'captcha_key': captcha_key,
-        'captcha_image': captcha_image,
+        'catalogo_cache_timeout': settings.CATALOGO_CACHE_TIMEOUT,
+        'catalogo_version': indice_catalogo.version_catalogo(),
+        # La misma URL que precarga la cabecera Link (webpage.precarga)
+        'fuentes_url': settings.FUENTES_URL,
         'page_title': 'VM Modulares - Muebles para Hogar y Empresa',
         'meta_description': 'VM Modulares: Fabricación, venta y distribución de muebles modulares para hogar y empresa. Cocinas, baños, dormitorios, oficinas y más.',
         'meta_keywords': 'muebles modulares, cocinas, baños, dormitorios, oficinas, escritorios, sillas, archivadores, VM Modulares'
@@ -153,8 +206,8 @@ def contacto(request):
                 mensaje=mensaje,
                 email_enviado=False  # Se actualizará después si el email se envía correctamente
             )
-        except Exception as e:
-            print(f"Error guardando contacto en BD: {e}")
+        except Exception:
+            logger.exception("Error guardando contacto en BD")
             # No fallar si no se puede guardar en BD
 
         # Enviar email (configurar en settings.py)
@@ -168,8 +221,8 @@ def contacto(request):
                 fail_silently=False,
             )
             email_enviado = True
-        except Exception as e:
-            print(f"Error enviando email: {e}")
+        except Exception:
+            logger.exception("Error enviando email de contacto")
             # No fallar si el email no se puede enviar
 
         # Actualizar el estado del email si se guardó correctamente
@@ -185,8 +238,8 @@ def contacto(request):
             'message': '¡Gracias por contactarnos! Te responderemos pronto.'
         })
         
-    except Exception as e:
-        print(f"Error en formulario de contacto: {e}")
+    except Exception:
+        logger.exception("Error en formulario de contacto")
         return JsonResponse({
             'success': False,
             'message': 'Hubo un error al procesar tu mensaje. Por favor, intenta nuevamente.'
@@ -194,6 +247,7 @@ def contacto(request):
 
 
 @require_http_methods(["GET"])
+@cache_publico()
 def get_subcategoria_fotos(request, subcategoria_id):
     """Vista API para obtener las fotos de una subcategoría específica"""
     try:
@@ -208,10 +262,14 @@ def get_subcategoria_fotos(request, subcategoria_id):
                 'id': foto.id,
                 'imagen_url': foto.imagen.url if foto.imagen else '',
                 'descripcion': foto.descripcion or '',
-                'orden': foto.orden
+                'orden': foto.orden,
+                'ancho': foto.ancho,
+                'alto': foto.alto,
+                'lqip': foto.lqip,
+                'color_dominante': foto.color_dominante
             })
         
-        return JsonResponse({
+        response = JsonResponse({
             'success': True,
             'subcategoria': {
                 'id': subcategoria.id,
@@ -220,15 +278,40 @@ def get_subcategoria_fotos(request, subcategoria_id):
             },
             'fotos': fotos_data
         })
+        # Se purga al cambiar sus fotos, la subcategoría o el nombre de su categoría
+        return agregar_claves(response, [clave_subcategoria(subcategoria.id), clave_categoria(subcategoria.categoria_id)])
         
     except Subcategoria.DoesNotExist:
         return JsonResponse({
             'success': False,
             'message': 'Subcategoría no encontrada'
         }, status=404)
-    except Exception as e:
-        print(f"Error obteniendo fotos de subcategoría: {e}")
+    except Exception:
+        logger.exception("Error obteniendo fotos de subcategoría", extra={'subcategoria_id': subcategoria_id})
         return JsonResponse({
             'success': False,
             'message': 'Error interno del servidor'
-        }, status=500)
\ No newline at end of file
+        }, status=500)
+
+@require_http_methods(["GET"])
+@cache_publico(claves=[CLAVE_CATALOGO])
+def buscar_catalogo(request):
+    """Vista API de búsqueda del catálogo (typeahead), servida desde el índice en memoria"""
+    termino = request.GET.get('q', '').strip()[:100]
+    try:
+        limite = min(max(int(request.GET.get('limite', 8)), 1), 20)
+    except ValueError:
+        limite = 8
+    try:
+        resultados = indice_catalogo.buscar_catalogo(termino, limite)
+    except Exception:
+        logger.exception("Error buscando en el catálogo", extra={'q': termino})
+        return JsonResponse({
+            'success': False,
+            'message': 'Error interno del servidor'
+        }, status=500)
+    return JsonResponse({
+        'success': True,
+        'q': termino,
+        'resultados': resultados
+    })